@@ -0,0 +1,126 @@
+"""
+Small in-process caches for LLM replies and retrieval results.
+"""
+import time
+from collections import OrderedDict
+from hashlib import sha256
+from pathlib import Path
+from threading import Lock
+from typing import Any, List, Optional
+
+import numpy as np
+
+from .config import get_settings
+
+
+_INDEX_STAMP = Path(get_settings().index_stamp_file).expanduser()
+
+
+def index_version() -> int:
+    """Return a stamp that changes whenever notes are ingested.
+
+    Ingestion usually runs in its own process (``python -m app.rag.ingest``),
+    so the stamp is the mtime of a shared file rather than in-process state;
+    one ``stat`` per lookup is cheap next to any cache miss.
+    """
+    try:
+        return _INDEX_STAMP.stat().st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def bump_index_version() -> None:
+    """Mark every answer and retrieval cached before now as stale."""
+    _INDEX_STAMP.parent.mkdir(parents=True, exist_ok=True)
+    _INDEX_STAMP.touch()
+
+
+def normalized_key(text: str) -> str:
+    """Return a cache key that ignores case and whitespace differences."""
+    return sha256(" ".join(text.lower().split()).encode("utf-8")).hexdigest()
+
+
+class TTLCache:
+    """LRU cache whose entries also expire ``ttl`` seconds after being stored."""
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 3600.0) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class SemanticCache:
+    """Nearest-neighbour cache over the embeddings of recent queries.
+
+    Entries live in a fixed-size ring buffer, so a lookup is a single
+    matrix-vector product over at most ``maxsize`` normalised vectors.
+    """
+
+    def __init__(self, maxsize: int = 256, threshold: float = 0.95, ttl: float = 3600.0) -> None:
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.ttl = ttl
+        self._vectors: Optional[np.ndarray] = None
+        self._expires = np.zeros(maxsize)
+        self._values: List[Any] = [None] * maxsize
+        self._size = 0
+        self._next = 0
+        self._lock = Lock()
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vec = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def get(self, vector) -> Optional[Any]:
+        with self._lock:
+            if not self._size:
+                return None
+            sims = self._vectors[: self._size] @ self._normalize(vector)
+            sims[self._expires[: self._size] < time.monotonic()] = -1.0
+            best = int(np.argmax(sims))
+            if sims[best] < self.threshold:
+                return None
+            return self._values[best]
+
+    def set(self, vector, value: Any) -> None:
+        vec = self._normalize(vector)
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.maxsize, vec.shape[0]), dtype=np.float32)
+            self._vectors[self._next] = vec
+            self._expires[self._next] = time.monotonic() + self.ttl
+            self._values[self._next] = value
+            self._next = (self._next + 1) % self.maxsize
+            self._size = min(self._size + 1, self.maxsize)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values = [None] * self.maxsize
+            self._size = 0
+            self._next = 0
@@ -1,10 +1,13 @@
 from functools import lru_cache
 from typing import Literal, Optional
 
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
+    # Frozen: settings are read once per process and shared via get_settings().
+    model_config = SettingsConfigDict(env_file=".env", frozen=True)
+
     api_token: Optional[str] = None
 
     # Database
@@ -14,10 +17,37 @@ class Settings(BaseSettings):
     llm_provider: Literal["ollama"] = "ollama"
     llm_model: str = "llama3"
     ollama_base_url: str = "http://host.docker.internal:11434"
+    # How long Ollama keeps the model loaded after a request (default there is 5m).
+    ollama_keep_alive: str = "30m"
+    # Backend for the agent's routing/extraction calls; "llamacpp" talks to a
+    # llama.cpp server's OpenAI-compatible API (needs langchain-openai).
+    llm_backend: Literal["ollama", "llamacpp"] = "ollama"
+    llamacpp_url: str = "http://host.docker.internal:8080/v1"
+    # Optional small model (e.g. "llama3.2:1b-instruct-q4_K_M") that labels
+    # ambiguous messages before extraction; unset uses the combined router.
+    intent_model: Optional[str] = None
+    # Concurrent routing calls arriving within this window share one prompt.
+    llm_batch_size: int = 8
+    llm_batch_wait_ms: int = 10
 
     # Qdrant / vector store
     qdrant_url: str = "http://qdrant:6333"
     qdrant_collection: str = "notes"
+    # "onnx" runs the int8-quantized MiniLM export on ONNX Runtime
+    # (needs optimum[onnxruntime]); "torch" loads the full-precision model.
+    embedding_backend: Literal["torch", "onnx"] = "onnx"
+    # Query embeddings persisted across restarts; empty disables the cache.
+    embedding_cache_dir: str = "~/.cache/personal-assistant/embeddings"
+    # Recent distinct questions embedded into that cache at startup; 0 disables.
+    embedding_warmup_size: int = 200
+
+    # Response caching (QA replies only; tool calls always run)
+    response_cache_size: int = 10_000
+    response_cache_ttl: int = 3600
+    semantic_cache_threshold: float = 0.95
+    # Touched by every ingestion so running workers drop cached answers;
+    # ingestion and the API must see the same file.
+    index_stamp_file: str = "~/.cache/personal-assistant/index-stamp"
 
     # Google Calendar
     google_credentials_file: str = "google_credentials.json"
@@ -28,14 +58,10 @@ class Settings(BaseSettings):
     # Read from NOTION_INTEGRATION_TOKEN in .env, but pass as INTERNAL_INTEGRATION_TOKEN to Docker
     notion_integration_token: Optional[str] = None
     notion_database_id: Optional[str] = None
-
-    @property
-    def internal_integration_token(self) -> Optional[str]:
-        """Return the token for use with Docker MCP server (which expects INTERNAL_INTEGRATION_TOKEN)."""
-        return self.notion_integration_token
-
-    class Config:
-        env_file = ".env"
+    # Name of a running mcp/notion container (the compose "notion-mcp" service)
+    # to `docker exec` the server in; unset starts a fresh `docker run`.
+    notion_mcp_container: Optional[str] = None
+    notion_mcp_command: str = "notion-mcp-server"
 
 
 @lru_cache
@@ -0,0 +1,45 @@
+"""
+Persistent cache of query embeddings, shared across restarts and workers.
+"""
+import os
+from hashlib import sha256
+from typing import Callable, List, Optional
+
+import diskcache
+import numpy as np
+
+
+class EmbeddingCache:
+    """Disk-backed map from (model, text) to the text's embedding.
+
+    Vectors are stored as raw float32 bytes (1.5 KB for a 384-dim MiniLM
+    vector) under ``sha256(model_name + "|" + text)``.
+    """
+
+    def __init__(self, directory: str, model_name: str) -> None:
+        self.model_name = model_name
+        self._cache = diskcache.Cache(os.path.expanduser(directory))
+
+    def _key(self, text: str) -> str:
+        return sha256(f"{self.model_name}|{text}".encode("utf-8")).hexdigest()
+
+    def get(self, text: str) -> Optional[List[float]]:
+        raw = self._cache.get(self._key(text))
+        if raw is None:
+            return None
+        return np.frombuffer(raw, dtype=np.float32).tolist()
+
+    def set(self, text: str, vector: List[float]) -> None:
+        self._cache.set(self._key(text), np.asarray(vector, dtype=np.float32).tobytes())
+
+    def wrap(self, embed: Callable[[str], List[float]]) -> Callable[[str], List[float]]:
+        """Return ``embed`` with lookups served from, and misses stored in, the cache."""
+
+        def cached_embed(text: str) -> List[float]:
+            vector = self.get(text)
+            if vector is None:
+                vector = embed(text)
+                self.set(text, vector)
+            return vector
+
+        return cached_embed
@@ -1,230 +1,766 @@
 from __future__ import annotations
 
-from datetime import datetime, timedelta
-from typing import List, Tuple
-import json
+from contextvars import ContextVar
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+import asyncio
+from typing import Any, AsyncIterator, Callable, List, Literal, Optional, Set, Tuple
+import logging
+import re
 
-from langchain_community.chat_models import ChatOllama
+from langchain_core.caches import InMemoryCache
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_ollama import ChatOllama
+import orjson
+from pydantic import BaseModel, ValidationError
+from pydantic_core import from_json
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
 
+from .batching import MicroBatcher
+from .cache import TTLCache, index_version, normalized_key
 from .config import get_settings
-from .langchain_rag import answer_with_context_langchain
+from .db import SessionLocal
 from .langchain_tools import create_event_tool, create_todo_tool
-from .mcp_clients import registry as mcp_registry
+from .llm.ollama import client_kwargs as ollama_client_kwargs
+from .mcp_clients import find_notion_create_tool, invalidate_notion_tools_cache, registry as mcp_registry
+from .models import ConversationLog
 
 
+logger = logging.getLogger(__name__)
+
 settings = get_settings()
 
+# Settings are frozen, so these can be read once at import time.
+LLAMACPP = settings.llm_backend == "llamacpp"
+BASE_URL = settings.llamacpp_url if LLAMACPP else settings.ollama_base_url
+MODEL = settings.llm_model
 
-async def classify_intent(message: str) -> str:
-    """Classify message intent as TODO, EVENT, or QA using the LLM."""
-    system_prompt = (
-        "You are an intent classifier for a personal assistant.\n"
-        "Given a single user message, decide if the primary intent is:\n"
-        "- TODO: creating or updating a personal todo/reminder/task.\n"
-        "- EVENT: scheduling or modifying a calendar event/meeting.\n"
-        "- QA: asking a question or chatting (no tool call).\n"
-        "Reply with exactly one word: TODO, EVENT, or QA."
-    )
-    llm = ChatOllama(
-        base_url=settings.ollama_base_url,
-        model=settings.llm_model,
+# Exact-match cache of QA replies keyed on the index stamp and the normalised
+# message, so an ingestion makes every earlier reply miss.
+_reply_cache = TTLCache(maxsize=settings.response_cache_size, ttl=settings.response_cache_ttl)
+
+# Routing/extraction decisions keyed on the day, the prefilter hint and the
+# normalised message; batched routing never hits the LLM-level cache below.
+_decision_cache = TTLCache(maxsize=settings.response_cache_size, ttl=settings.response_cache_ttl)
+
+
+# Routing/extraction replies keyed on (model, call options, prompt). The
+# prompts end with today's date, so entries stop matching at midnight. QA
+# answers use their own caches in langchain_rag.
+_llm_cache = InMemoryCache(maxsize=settings.response_cache_size)
+
+
+@lru_cache(maxsize=4)
+def _get_llm(base_url: str, model: str) -> BaseChatModel:
+    """Return a shared chat model client for ``model``.
+
+    Output format is chosen per call (see ``_call_options``), so one instance
+    per model is enough. Decoding is greedy (temperature 0): routing and
+    extraction want the single most likely answer, and it makes cached
+    replies identical to fresh ones. ``keep_alive`` keeps the model loaded in
+    Ollama between requests, and repeated prompts are answered from
+    ``_llm_cache``.
+    """
+    if LLAMACPP:
+        # Optional dependency, only needed for the llama.cpp backend.
+        from langchain_openai import ChatOpenAI
+
+        return ChatOpenAI(
+            base_url=base_url,
+            model=model,
+            api_key="sk-none",
+            temperature=0,
+            cache=_llm_cache,
+        )
+    return ChatOllama(
+        base_url=base_url,
+        model=model,
+        keep_alive=settings.ollama_keep_alive,
+        temperature=0,
+        cache=_llm_cache,
+        client_kwargs=ollama_client_kwargs(),
     )
-    messages = [
-        ("system", system_prompt),
-        ("user", message),
-    ]
-    response = llm.invoke(messages)
-    raw = response.content if hasattr(response, "content") else str(response)
-    intent = raw.strip().upper().split()[0]
+
+
+def _call_options(max_tokens: int, schema: Optional[dict] = None, json_mode: bool = True) -> dict:
+    """Per-call decoding options in the shape the configured backend expects.
+
+    ``max_tokens`` caps decoding; with ``json_mode`` the reply is constrained
+    to JSON, or to ``schema`` when given.
+    """
+    if LLAMACPP:
+        options: dict = {"max_tokens": max_tokens}
+        if json_mode:
+            options["response_format"] = {"type": "json_object"}
+            if schema:
+                # llama.cpp server extension: constrain output to the schema.
+                options["response_format"]["schema"] = schema
+        return options
+    # langchain_ollama uses a per-call ``options`` dict instead of the
+    # instance defaults, so the greedy temperature has to be repeated here.
+    options = {"options": {"num_predict": max_tokens, "temperature": 0}}
+    if json_mode:
+        options["format"] = schema or "json"
+    return options
+
+
+@lru_cache(maxsize=1)
+def _import_rag():
+    """Import the RAG module on first use.
+
+    It imports sentence-transformers and opens the Qdrant client at import time,
+    which workers that only ever see todo:/event: commands never need.
+    """
+    from . import langchain_rag
+
+    return langchain_rag
+
+
+async def _rag():
+    """Return the RAG module, importing it in a worker thread the first time.
+
+    The first import takes seconds and would otherwise stall every other
+    request on the event loop.
+    """
+    if _import_rag.cache_info().currsize:
+        return _import_rag()
+    return await asyncio.to_thread(_import_rag)
+
+
+async def _retrieve_context(message: str):
+    return await (await _rag()).retrieve_context(message)
+
+
+# Explicit "todo:"/"task:"/"event:" prefixes, matched without lowercasing
+# the message first.
+_CMD_RE = re.compile(r"\s*(todo|task|event)\s*:", re.IGNORECASE)
+
+# Deterministic pre-classifier for unambiguous commands. A hit skips the
+# router and goes straight to a side-effecting tool, so both patterns only
+# accept imperative sentence starts. Anything phrased as a question, matching
+# both patterns or matching neither goes to the LLM router.
+_TODO_RE = re.compile(
+    r"^\s*(?:please\s+)?(?:"
+    r"(?:add|create|make)\s+(?:a\s+|an\s+|new\s+|another\s+)?(?:todo|to-do|task|reminder)\b"
+    r"|add\b.{1,60}\bto\s+(?:my\s+)?(?:todo|to-do|task)s?(?:\s+list)?\b"
+    r"|remind\s+me\s+to\b"
+    r"|don'?t\s+let\s+me\s+forget\s+to\b)",
+    re.IGNORECASE,
+)
+_EVENT_RE = re.compile(
+    r"^\s*(?:please\s+)?(?:"
+    r"(?:schedule|book)\s+(?:a|an|my|the)\b"
+    r"|(?:set\s+up|arrange)\s+(?:a|an)\s+(?:meeting|call|appointment|event)\b"
+    r"|(?:add|put)\b.{1,60}\b(?:to|in|on)\s+(?:my\s+)?calendar\b)",
+    re.IGNORECASE,
+)
+# Questions and requests about existing notes, even without a "?".
+_QUESTION_RE = re.compile(
+    r"\?\s*$|^\s*(?:who|what|when|where|why|how|which|do|does|did|is|are|can|could"
+    r"|summari[sz]e|tell\s+me|show\s+me|explain)\b",
+    re.IGNORECASE,
+)
+
+# Static instructions first and the date last, so Ollama can reuse the
+# cached prompt prefix between calls.
+_ROUTER_PROMPT = (
+    "Route the user message for a personal assistant. Output JSON:\n"
+    '{"intent":"TODO|EVENT|QA","text":s,"due":s,"title":s,"start":s,"end":s}\n'
+    "TODO=todo/reminder/task; EVENT=calendar event/meeting; QA=question or chat.\n"
+    "TODO: text=concise title keeping times, places and context, without "
+    "'add todo'/'remind me to'; due=ISO8601 only for an explicit deadline, else null.\n"
+    "EVENT: title; start,end=ISO8601 datetimes; end=start+1h if missing.\n"
+    "Unused keys null."
+)
+_TODO_PROMPT = (
+    'Output JSON {"text":s,"due":s} for the todo in the user message.\n'
+    "text=concise title keeping times, places and context, without "
+    "'add todo'/'remind me to'; due=ISO8601 only for an explicit deadline, else null."
+)
+_EVENT_PROMPT = (
+    'Output JSON {"title":s,"start":s,"end":s} for the calendar event in the user message.\n'
+    "start,end=ISO8601 datetimes; end=start+1h if missing."
+)
+_PROMPTS = {"TODO": _TODO_PROMPT, "EVENT": _EVENT_PROMPT}
+
+
+class AgentDecision(BaseModel):
+    """Combined routing + extraction result; keys unused by ``intent`` stay None."""
+
+    intent: Literal["TODO", "EVENT", "QA"]
+    text: Optional[str] = None
+    due: Optional[str] = None
+    title: Optional[str] = None
+    start: Optional[str] = None
+    end: Optional[str] = None
+
+
+class TodoOut(BaseModel):
+    text: str
+    due: Optional[str]
+
+
+class EventOut(BaseModel):
+    title: str
+    start: str
+    end: Optional[str] = None
+
+
+# JSON schemas passed as Ollama's ``format`` so decoding is constrained to
+# exactly these shapes instead of just "some JSON object".
+_ROUTER_SCHEMA = AgentDecision.model_json_schema()
+_OUTPUT_MODELS = {"TODO": TodoOut, "EVENT": EventOut}
+_SCHEMAS = {intent: model.model_json_schema() for intent, model in _OUTPUT_MODELS.items()}
+
+
+def prefilter_intent(message: str) -> Optional[str]:
+    """Return TODO or EVENT for unambiguous commands, or None if the LLM must decide."""
+    # An explicit command prefix wins even if the text reads like a question.
+    command = _CMD_RE.match(message)
+    if command is not None:
+        return "EVENT" if command.group(1).lower() == "event" else "TODO"
+    if _QUESTION_RE.search(message) is not None:
+        return None
+    is_todo = _TODO_RE.search(message) is not None
+    is_event = _EVENT_RE.search(message) is not None
+    if is_todo == is_event:
+        return None
+    return "TODO" if is_todo else "EVENT"
+
+
+_ROUTER_BATCH_PROMPT = (
+    "You get several numbered user messages, one per line as '[i] message'.\n"
+    "Treat each independently. Output a JSON object mapping each index i "
+    "(as a string) to that message's object, following these rules:\n"
+    + _ROUTER_PROMPT
+)
+
+
+# Enough for one routing/extraction object; batched calls get this per message.
+_MAX_JSON_TOKENS = 128
+
+
+def _extract_json(raw: str) -> dict:
+    """Parse a JSON-mode LLM reply, or return {} if it isn't a JSON object."""
+    try:
+        parsed = orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        # Only reachable if generation was cut short mid-object (num_predict
+        # or context overflow); keep whatever complete fields were emitted.
+        try:
+            parsed = from_json(raw, allow_partial=True)
+        except ValueError:
+            return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+@lru_cache(maxsize=16)
+def _dated_system_message(system_prompt: str, today: str) -> SystemMessage:
+    """Return the system message for ``system_prompt``, built once per day.
+
+    Passing message objects rather than ``("role", text)`` tuples spares
+    LangChain converting the prompt again on every call.
+    """
+    return SystemMessage(f"{system_prompt}\nToday={today}.")
+
+
+async def _invoke_llm(
+    system_prompt: str,
+    user_content: str,
+    max_tokens: int = _MAX_JSON_TOKENS,
+    schema: Optional[dict] = None,
+) -> str:
+    """Call the LLM in JSON mode and return the raw reply text.
+
+    ``max_tokens`` caps decoding (``num_predict`` on Ollama); JSON mode can
+    otherwise keep emitting whitespace after the object is closed. With a
+    ``schema`` the output is constrained to that JSON schema.
+    """
+    today_str = date.today().isoformat()
+    llm = _get_llm(BASE_URL, MODEL)
+    messages = [_dated_system_message(system_prompt, today_str), HumanMessage(user_content)]
+    response = await llm.ainvoke(messages, **_call_options(max_tokens, schema))
+    return response.content if hasattr(response, "content") else str(response)
+
+
+async def _stream_llm(
+    system_prompt: str,
+    user_content: str,
+    on_partial: Callable[[dict], None],
+    max_tokens: int = _MAX_JSON_TOKENS,
+    schema: Optional[dict] = None,
+) -> str:
+    """Streaming ``_invoke_llm``: ``on_partial`` sees the object as it grows.
+
+    The buffer is re-parsed in partial mode after every chunk. Incomplete
+    trailing strings are dropped, so any field ``on_partial`` sees is final.
+    """
+    today_str = date.today().isoformat()
+    llm = _get_llm(BASE_URL, MODEL)
+    messages = [_dated_system_message(system_prompt, today_str), HumanMessage(user_content)]
+    raw = ""
+    async for chunk in llm.astream(messages, **_call_options(max_tokens, schema)):
+        text = chunk.content if hasattr(chunk, "content") else str(chunk)
+        if not text:
+            continue
+        raw += text
+        try:
+            partial = from_json(raw, allow_partial=True)
+        except ValueError:
+            continue
+        if isinstance(partial, dict):
+            on_partial(partial)
+    return raw
+
+
+async def _invoke_json(
+    system_prompt: str,
+    user_content: str,
+    max_tokens: int = _MAX_JSON_TOKENS,
+    schema: Optional[dict] = None,
+) -> dict:
+    """Like ``_invoke_llm`` but return the parsed object, or {}."""
+    return _extract_json(await _invoke_llm(system_prompt, user_content, max_tokens, schema))
+
+
+def _normalize_decision(data: dict) -> dict:
+    """Ensure ``data["intent"]`` is one of TODO, EVENT or QA."""
+    intent = str(data.get("intent") or "QA").strip().upper()
     if intent not in {"TODO", "EVENT", "QA"}:
-        return "QA"
-    return intent
-
-
-async def extract_todo(message: str) -> Tuple[str, str | None]:
-    """Use the LLM to extract todo text and optional due datetime."""
-    system_prompt = (
-        "You extract todo information from natural language and create a clear, concise todo title.\n"
-        "Given one user message, output ONLY a JSON object with keys:\n"
-        '{ "text": string, "due": string | null }.\n'
-        "- 'text' should be a natural, concise todo title that includes ALL relevant details.\n"
-        "  CRITICAL: Include times, dates, locations, and contextual information in the title.\n"
-        "  Examples:\n"
-        "  - Input: 'add todo to buy a bus ticket to airport (stansted at 23:20)'\n"
-        "    Output text: 'Buy bus ticket to Stansted for 23:20 flight'\n"
-        "  - Input: 'add todo \"buy bus ticket to stansted for tomorrow 23:20\"'\n"
-        "    Output text: 'Buy bus ticket to Stansted for tomorrow 23:20'\n"
-        "  - Input: 'remind me to call John tomorrow'\n"
-        "    Output text: 'Call John'\n"
-        "  - Input: 'todo: finish the report by Friday'\n"
-        "    Output text: 'Finish the report'\n"
-        "  Remove command phrases like 'add todo', 'remind me to', 'todo:', etc.\n"
-        "  Keep ALL contextual information: flight times, locations, dates mentioned in context.\n"
-        "- 'due' should ONLY be set if the user explicitly mentions a DEADLINE or DUE DATE.\n"
-        "  Examples of due dates/deadlines: 'due tomorrow', 'by Friday', 'deadline next week', 'due on 2025-11-15'.\n"
-        "  IMPORTANT: Times and dates that are CONTEXTUAL (like flight times, meeting times) should be in 'text', NOT in 'due'.\n"
-        "  Example: 'buy ticket for flight at 23:20' → text includes '23:20', due is null (not a deadline).\n"
-        "  Example: 'finish report by Friday' → text is 'Finish report', due is Friday (this IS a deadline).\n"
-        "- If 'due' is set, it should be an ISO 8601 datetime (e.g. 2025-11-15T09:00:00).\n"
-        "  Interpret relative dates like 'today', 'tomorrow', or weekdays relative to the current date.\n"
-        "- If no explicit due date/deadline is mentioned, set 'due' to null.\n"
-        "Do not include any explanation text, only the JSON."
-    )
-    llm = ChatOllama(
-        base_url=settings.ollama_base_url,
-        model=settings.llm_model,
-    )
-    messages = [
-        ("system", system_prompt),
-        ("user", message),
-    ]
-    response = llm.invoke(messages)
-    raw = response.content if hasattr(response, "content") else str(response)
+        intent = "QA"
+    data["intent"] = intent
+    return data
+
 
+async def _route_one(message: str) -> dict:
+    raw = await _invoke_llm(_ROUTER_PROMPT, message, schema=_ROUTER_SCHEMA)
     try:
-        start_idx = raw.find("{")
-        end_idx = raw.rfind("}")
-        if start_idx == -1 or end_idx == -1:
-            return message, None
-        data = json.loads(raw[start_idx : end_idx + 1])
-        text = str(data.get("text") or message).strip()
-        due = data.get("due")
-        return text, str(due) if due else None
-    except Exception:
-        return message, None
-
-
-async def extract_event(message: str) -> Tuple[str, str, str]:
-    """Use the LLM to extract event details as ISO datetimes."""
-    now = datetime.utcnow()
-    today_str = now.date().isoformat()
-
-    system_prompt = (
-        "You extract calendar event details from natural language.\n"
-        "Given one user message, output ONLY a JSON object with keys:\n"
-        '{ "title": string, "start": string, "end": string }.\n'
-        "- 'start' and 'end' must be full ISO 8601 datetimes "
-        "(e.g. 2025-11-15T09:00:00).\n"
-        f"- Today is {today_str}. Interpret relative dates like 'today', "
-        "'tomorrow', or weekdays relative to this date.\n"
-        "- If the user does not specify an end time, set 'end' to exactly "
-        "1 hour after 'start'.\n"
-        "Do not include any explanation text, only the JSON."
+        return AgentDecision.model_validate_json(raw).model_dump()
+    except ValidationError:
+        # Truncated output or an unexpected intent label.
+        return _normalize_decision(_extract_json(raw))
+
+
+async def _route_batch(messages: List[str]) -> List[dict]:
+    """Route several concurrent messages with one prompt using [i] identifiers."""
+    if len(messages) == 1:
+        return [await _route_one(messages[0])]
+
+    user_content = "\n".join(
+        f"[{idx}] {' '.join(msg.split())}" for idx, msg in enumerate(messages)
     )
-    llm = ChatOllama(
-        base_url=settings.ollama_base_url,
-        model=settings.llm_model,
+    data = await _invoke_json(
+        _ROUTER_BATCH_PROMPT, user_content, max_tokens=_MAX_JSON_TOKENS * len(messages)
     )
-    messages = [
-        ("system", system_prompt),
-        ("user", message),
-    ]
-    response = llm.invoke(messages)
+
+    results: List[Optional[dict]] = []
+    for idx in range(len(messages)):
+        item = data.get(str(idx))
+        results.append(_normalize_decision(item) if isinstance(item, dict) else None)
+
+    # Anything the batched answer dropped is routed on its own.
+    missing = [idx for idx, item in enumerate(results) if item is None]
+    if missing:
+        retried = await asyncio.gather(*(_route_one(messages[idx]) for idx in missing))
+        for idx, item in zip(missing, retried):
+            results[idx] = item
+    return results
+
+
+_INTENT_PROMPT = (
+    "Classify the user message for a personal assistant. Answer with one word: "
+    "TODO (todo/reminder/task), EVENT (calendar event/meeting) or QA (question or chat)."
+)
+_INTENT_SYSTEM_MESSAGE = SystemMessage(_INTENT_PROMPT)
+
+
+def _parse_intent_label(response: Any) -> str:
     raw = response.content if hasattr(response, "content") else str(response)
+    label = raw.strip().upper()
+    for intent in ("TODO", "EVENT"):
+        if label.startswith(intent):
+            return intent
+    return "QA"
+
+
+async def _classify_batch(messages: List[str]) -> List[str]:
+    """Classify concurrent messages with one ``abatch`` call on the intent model.
+
+    Every request shares the same system prompt, so Ollama can reuse the
+    cached prefix across the batch.
+    """
+    llm = _get_llm(BASE_URL, settings.intent_model)
+    # The label is a single word, so a couple of tokens is all we decode.
+    responses = await llm.abatch(
+        [[_INTENT_SYSTEM_MESSAGE, HumanMessage(message)] for message in messages],
+        **_call_options(3, json_mode=False),
+    )
+    return [_parse_intent_label(response) for response in responses]
+
+
+_intent_batcher = MicroBatcher(
+    _classify_batch,
+    max_batch=settings.llm_batch_size,
+    max_wait=settings.llm_batch_wait_ms / 1000,
+)
+
+
+async def classify_intent(message: str) -> str:
+    """Label the message TODO, EVENT or QA using ``settings.intent_model``.
+
+    Unambiguous commands are labelled by ``prefilter_intent`` without a model
+    call; the rest go through the intent batcher.
+    """
+    intent = prefilter_intent(message)
+    if intent is not None:
+        return intent
+    return await _intent_batcher.submit(message)
+
 
+_router_batcher = MicroBatcher(
+    _route_batch,
+    max_batch=settings.llm_batch_size,
+    max_wait=settings.llm_batch_wait_ms / 1000,
+)
+
+
+# Cheap signal that a message is probably a command rather than a question,
+# used to decide whether speculative extraction is worth the extra calls.
+_ACTION_HINT_RE = re.compile(
+    r"\b(?:todo|to-do|task|remind|remember|schedule|meeting|appointment|calendar"
+    r"|today|tonight|tomorrow|next\s+week|\d{1,2}(?::\d{2})?\s*(?:am|pm))\b",
+    re.IGNORECASE,
+)
+
+
+# Any date or time reference at all. Events without one can't be extracted
+# better than the "tomorrow, 1 hour" fallback, so they skip the LLM call.
+_TIME_HINTS = re.compile(
+    r"\b(?:today|tonight|tomorrow|noon|midnight|morning|afternoon|evening|weekend"
+    r"|(?:mon|tues|wednes|thurs|fri|satur|sun)day|next\s+\w+|in\s+\d+\s+\w+"
+    r"|(?:jan|feb|mar|apr|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+\d{1,2}|may\s+\d{1,2}"
+    r"|\d{1,2}(?::\d{2})?\s*(?:am|pm|h)|\d{1,2}:\d{2}|at\s+\d{1,2}|\d{1,2}(?:st|nd|rd|th)"
+    r"|\d{4}-\d{2}-\d{2}|\d{1,2}/\d{1,2}(?:/\d{2,4})?)\b",
+    re.IGNORECASE,
+)
+
+
+# Progress sink of the current request, set by stream_agent so the EVENT
+# extraction can report the title before the rest of the JSON is decoded.
+_progress_cv: ContextVar[Optional[Callable[[dict], None]]] = ContextVar("progress", default=None)
+
+
+async def _extract(
+    intent: str,
+    message: str,
+    on_progress: Optional[Callable[[dict], None]] = None,
+) -> dict:
+    """Extract the TODO or EVENT fields for ``message`` with the focused prompt.
+
+    With ``on_progress``, an EVENT reply is streamed and ``{"intent",
+    "title"}`` is reported as soon as the title has been generated.
+    """
+    if intent == "EVENT" and _TIME_HINTS.search(message) is None:
+        # Nothing to extract; _event_from_decision falls back to tomorrow.
+        return {"intent": intent}
+    if on_progress is not None and intent == "EVENT":
+        announced = False
+
+        def report(partial: dict) -> None:
+            nonlocal announced
+            if not announced and partial.get("title"):
+                announced = True
+                on_progress({"intent": intent, "title": str(partial["title"])})
+
+        raw = await _stream_llm(_PROMPTS[intent], message, report, schema=_SCHEMAS[intent])
+    else:
+        raw = await _invoke_llm(_PROMPTS[intent], message, schema=_SCHEMAS[intent])
     try:
-        start_idx = raw.find("{")
-        end_idx = raw.rfind("}")
-        if start_idx == -1 or end_idx == -1:
-            raise ValueError("No JSON found")
-        data = json.loads(raw[start_idx : end_idx + 1])
-        title = str(data["title"]).strip()
-        start_str = str(data["start"]).strip()
-        start_dt = datetime.fromisoformat(start_str)
-        end_str = data.get("end")
+        data = _OUTPUT_MODELS[intent].model_validate_json(raw).model_dump()
+    except ValidationError:
+        data = _extract_json(raw)
+    data["intent"] = intent
+    return data
+
+
+async def _decide(message: str, intent: Optional[str]) -> dict:
+    if intent is None and settings.intent_model:
+        if _ACTION_HINT_RE.search(message) is None:
+            intent = await classify_intent(message)
+        else:
+            intent, *extracted = await asyncio.gather(
+                classify_intent(message),
+                *(_extract(name, message) for name in _PROMPTS),
+            )
+            if intent != "QA":
+                return dict(zip(_PROMPTS, extracted))[intent]
+        if intent == "QA":
+            return {"intent": "QA"}
+    if intent is None:
+        return await _router_batcher.submit(message)
+
+    # Only a known intent streams progress; the speculative extractions above
+    # could report a title for a message that turns out to be a todo.
+    return await _extract(intent, message, on_progress=_progress_cv.get())
+
+
+async def classify_and_extract(message: str, intent: Optional[str] = None) -> dict:
+    """Classify the message and extract todo/event details in one LLM call.
+
+    When ``intent`` is already known (see ``prefilter_intent``) only the
+    matching fields are requested. If ``settings.intent_model`` is set, a
+    small model labels the message first and only todos and events get the
+    extraction call; messages that look like commands run both extractions
+    alongside the label so the second round-trip overlaps the first.
+    Otherwise the message goes through the router batcher, so concurrent
+    requests share a single LLM call. Repeated messages are answered from
+    ``_decision_cache``. Returns the parsed JSON object with ``intent``
+    normalised to one of TODO, EVENT or QA. The remaining keys are only
+    meaningful for the matching intent and may be missing.
+    """
+    # Extracted dates are relative to today, so the day is part of the key.
+    cache_key = f"{date.today().isoformat()}:{intent}:{normalized_key(message)}"
+    decision = _decision_cache.get(cache_key)
+    if decision is None:
+        decision = await _decide(message, intent)
+        _decision_cache.set(cache_key, decision)
+    return dict(decision)
+
+
+def _todo_from_decision(decision: dict, message: str) -> Tuple[str, str | None]:
+    """Return (text, due_iso) for a TODO decision, falling back to the raw message."""
+    text = str(decision.get("text") or message).strip()
+    due = decision.get("due")
+    return text, str(due) if due else None
+
+
+# Fallback for shapes fromisoformat rejects, e.g. a single-digit hour ('2025-11-15 9:00').
+_DATETIME_RE = re.compile(r"(\d{4})-(\d{2})-(\d{2})[ T](\d{1,2}):(\d{2})")
+
+
+def _parse_datetime(value: str) -> datetime:
+    """Parse an LLM-extracted datetime, ISO 8601 or 'YYYY-MM-DD H:MM'.
+
+    The result is naive UTC, the convention of the whole event path (the
+    calendar tools send naive times with ``timeZone: UTC``). An explicit
+    offset such as ``Z`` or ``+02:00`` is converted rather than dropped.
+    """
+    value = value.strip()
+    # datetime.fromisoformat is implemented in C and, since Python 3.11,
+    # accepts both the space and 'T' separators without seconds.
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    else:
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+
+    match = _DATETIME_RE.fullmatch(value)
+    if match:
+        try:
+            return datetime(*map(int, match.groups()))
+        except ValueError:
+            pass
+
+    raise ValueError(f"Could not parse datetime from '{value}'")
+
+
+def _event_from_decision(decision: dict, message: str) -> Tuple[str, datetime, datetime]:
+    """Return (title, start, end) for an EVENT decision."""
+    try:
+        title = str(decision["title"]).strip()
+        start_dt = _parse_datetime(str(decision["start"]))
+        end_str = decision.get("end")
         if end_str:
-            end_dt = datetime.fromisoformat(str(end_str).strip())
+            end_dt = _parse_datetime(str(end_str))
         else:
             end_dt = start_dt + timedelta(hours=1)
-        return title, start_dt.isoformat(), end_dt.isoformat()
+        return title, start_dt, end_dt
     except Exception:
         # Fallback: treat the whole message as the title and schedule a 1-hour event tomorrow
-        start_dt = now + timedelta(days=1)
+        start_dt = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(days=1)
         end_dt = start_dt + timedelta(hours=1)
-        return message.strip(), start_dt.isoformat(), end_dt.isoformat()
+        return message.strip(), start_dt, end_dt
 
 
-async def run_agent(message: str) -> Tuple[str, List[str], List[str]]:
-    """LangChain-based agent that combines RAG with tool calling."""
-    used_tools: List[str] = []
-    retrieved_doc_ids: List[str] = []
+async def _route(message: str) -> Tuple[dict, Optional[asyncio.Task], Optional[asyncio.Task]]:
+    """Decide the message intent, speculatively starting RAG retrieval.
+
+    Returns (decision, retrieval_task, tools_task). The retrieval task is
+    only set for QA and the Notion tools fetch only for TODO. Both are
+    returned rather than stored in context variables because stream_agent
+    runs this in its own task, whose context changes the caller never sees.
+    """
+    # Obvious commands skip the routing part of the prompt entirely.
+    intent_hint = prefilter_intent(message)
+
+    # Most messages that reach the LLM router are questions, so start the RAG
+    # retrieval speculatively while the router decides and drop it otherwise.
+    retrieval_task = None
+    if intent_hint is None:
+        retrieval_task = asyncio.create_task(_retrieve_context(message))
+        # Mark failures as retrieved so an unused task doesn't log a warning.
+        retrieval_task.add_done_callback(lambda t: t.cancelled() or t.exception())
 
-    intent = await classify_intent(message)
+    # Likewise connect to the Notion MCP server while the LLM works, for
+    # messages that are or look like todos. The fetch is never cancelled:
+    # cancelling it mid-handshake would tear down the container it starts,
+    # while a finished fetch leaves a session that later todos reuse.
+    tools_task = None
+    if settings.notion_integration_token and (
+        intent_hint == "TODO" or (intent_hint is None and _ACTION_HINT_RE.search(message))
+    ):
+        tools_task = asyncio.create_task(mcp_registry.get_tools("notion"))
+        _background_tasks.add(tools_task)
+        tools_task.add_done_callback(_background_tasks.discard)
+
+    try:
+        decision = await classify_and_extract(message, intent=intent_hint)
+    except BaseException:
+        if retrieval_task is not None:
+            retrieval_task.cancel()
+        raise
+    intent = decision["intent"]
+    if retrieval_task is not None and intent != "QA":
+        retrieval_task.cancel()
+        retrieval_task = None
+    if intent != "TODO":
+        tools_task = None
 
     # Log the detected intent
-    import sys
-    print(f"DEBUG: Detected intent: {intent} for message: '{message[:50]}...'", file=sys.stderr, flush=True)
+    logger.debug("Detected intent: %s for message: '%.50s...'", intent, message)
+
+    return decision, retrieval_task, tools_task
+
+
+def _notion_todo_args(database_id: str, text: str, due_iso: Optional[str]) -> dict:
+    """Build the Notion "create page" arguments for a todo in ``database_id``.
+
+    Property names must match the database: "Name" is the usual title
+    property, "Status" is set to "To Do", and "Due Date" is only added for a
+    valid due date. Adjust the names here if your database uses others
+    (e.g. "Task Status").
+    """
+    properties = {
+        "Name": {"title": [{"text": {"content": text}}]},
+        "Status": {"select": {"name": "To Do"}},
+    }
+    if due_iso:
+        # Parse ISO datetime to date if needed
+        due_date = due_iso.strip().partition("T")[0]
+        try:
+            date.fromisoformat(due_date)
+        except ValueError:
+            # Not a real date (e.g. "2024-13-45"); Notion would reject it anyway.
+            pass
+        else:
+            properties["Due Date"] = {"date": {"start": due_date}}
+    return {"parent": {"database_id": database_id}, "properties": properties}
+
+
+class NotionResult(BaseModel):
+    """The fields the agent reads from a Notion page or error object."""
+
+    object: Optional[str] = None
+    url: Optional[str] = None
+    message: Optional[str] = None
+    code: Optional[str] = None
+
+
+def _parse_notion_result(result: Any) -> NotionResult:
+    """Parse an MCP tool result, which may be a dict or a JSON string."""
+    if isinstance(result, dict):
+        return NotionResult.model_validate(result)
+    if isinstance(result, str):
+        try:
+            return NotionResult.model_validate_json(result)
+        except ValidationError:
+            # Maybe the JSON is wrapped in other text; try the outermost braces once.
+            start, end = result.find("{"), result.rfind("}")
+            if start != -1 and end > start:
+                try:
+                    return NotionResult.model_validate_json(result[start:end + 1])
+                except ValidationError:
+                    pass
+    return NotionResult()
+
+
+def _extract_url(result: Any) -> Optional[str]:
+    """Return the created page URL from a Notion tool result.
+
+    Raises if Notion answered with an error object, so callers can fall back.
+    """
+    parsed = _parse_notion_result(result)
+    if parsed.object == "error":
+        logger.debug("Notion API returned error: %s - %s", parsed.code, parsed.message)
+        raise Exception(f"Notion API error: {parsed.message or 'Unknown error'}")
+    return parsed.url
+
+
+# DB session of the current request, if the endpoint has one; every local
+# tool call in the turn then shares it instead of checking out its own.
+_db_session_cv: ContextVar[Optional[Session]] = ContextVar("db_session", default=None)
+
+
+async def _create_local_todo(text: str, due_iso: Optional[str]) -> str:
+    """Create the todo in the local DB; the session is blocking, so use a thread."""
+    return await asyncio.to_thread(
+        create_todo_tool, text=text, due_iso=due_iso, db=_db_session_cv.get()
+    )
+
+
+async def _run_tool_intent(
+    message: str,
+    decision: dict,
+    tools_task: Optional[asyncio.Task] = None,
+) -> Tuple[str, List[str]]:
+    """Carry out a TODO or EVENT decision. Returns (reply, used_tools).
+
+    ``tools_task`` is the Notion tools fetch ``_route`` already started, if any.
+    """
+    used_tools: List[str] = []
+    intent = decision["intent"]
 
     if intent == "TODO":
+        # Extracted once up front; every fallback below reuses these values.
+        text, due_iso = _todo_from_decision(decision, message)
         # Try to use Notion MCP tools first, fall back to DB if not available
-        from .config import get_settings
-        settings = get_settings()
 
         # Explicit logging to see what's happening
-        import sys
-        print(f"DEBUG: TODO intent detected", file=sys.stderr, flush=True)
-        print(f"DEBUG: notion_integration_token is set: {bool(settings.notion_integration_token)}", file=sys.stderr, flush=True)
+        logger.debug("TODO intent detected")
+        logger.debug("notion_integration_token is set: %s", bool(settings.notion_integration_token))
         if settings.notion_integration_token:
-            print(f"DEBUG: Token value starts with: {settings.notion_integration_token[:10] if settings.notion_integration_token else 'None'}...", file=sys.stderr, flush=True)
+            logger.debug("Token value starts with: %.10s...", settings.notion_integration_token)
             # Notion is configured, try to use it via MCP registry
-            notion_tools = await mcp_registry.get_tools("notion")
+            if tools_task is not None:
+                # Shielded so a cancelled request doesn't cancel the shared fetch.
+                notion_tools = await asyncio.shield(tools_task)
+            else:
+                notion_tools = await mcp_registry.get_tools("notion")
 
             if notion_tools:
-                # Log available tools for debugging
-                import sys
-                tool_names = [tool.name for tool in notion_tools]
-                print(f"DEBUG: Found {len(notion_tools)} Notion MCP tools: {tool_names}", file=sys.stderr, flush=True)
+                if logger.isEnabledFor(logging.DEBUG):
+                    tool_names = [tool.name for tool in notion_tools]
+                    logger.debug("Found %d Notion MCP tools: %s", len(notion_tools), tool_names)
 
                 # Find the create page tool - we want to create a PAGE in a database
-                # The correct tool is "API-post-page" (HTTP POST = create)
-                create_tool = None
-
-                # Priority 1: Look for "post-page" or "post_page" (HTTP POST = create)
-                for tool in notion_tools:
-                    tool_name_lower = tool.name.lower()
-                    if ("post" in tool_name_lower and "page" in tool_name_lower):
-                        create_tool = tool
-                        print(f"DEBUG: Using Notion MCP tool (post-page): {tool.name}", file=sys.stderr, flush=True)
-                        break
-
-                # Priority 2: Look for tools with "create" AND "page" but NOT "comment" or "database" (as verb)
-                if not create_tool:
-                    for tool in notion_tools:
-                        tool_name_lower = tool.name.lower()
-                        # Must have "create" and "page"
-                        # Must NOT have "comment", "database" (as in creating a database), "update", "delete"
-                        if ("create" in tool_name_lower and
-                            "page" in tool_name_lower and
-                            "comment" not in tool_name_lower and
-                            "update" not in tool_name_lower and
-                            "delete" not in tool_name_lower):
-                            # Check if it's about creating a database (bad) vs creating a page (good)
-                            if "create" in tool_name_lower and "database" in tool_name_lower and "page" not in tool_name_lower:
-                                continue  # Skip tools that create databases
-                            create_tool = tool
-                            print(f"DEBUG: Using Notion MCP tool (create page): {tool.name}", file=sys.stderr, flush=True)
-                            break
-
-                # Priority 3: Exact match for known tool names
-                if not create_tool:
-                    exact_matches = ["api-post-page", "post-page", "create-page", "create_page"]
-                    for tool in notion_tools:
-                        if tool.name.lower() in exact_matches:
-                            create_tool = tool
-                            print(f"DEBUG: Using Notion MCP tool (exact match): {tool.name}", file=sys.stderr, flush=True)
-                            break
+                create_tool = find_notion_create_tool(notion_tools)
+                if create_tool:
+                    logger.debug("Using Notion MCP tool: %s", create_tool.name)
 
                 # If still no tool found, log all create/post-related tools for debugging
                 if not create_tool:
                     create_related = [t.name for t in notion_tools if "create" in t.name.lower() or "post" in t.name.lower()]
-                    print(f"DEBUG: No suitable create-page tool found. Create/post-related tools: {create_related}", file=sys.stderr, flush=True)
+                    logger.debug("No suitable create-page tool found. Create/post-related tools: %s", create_related)
 
                 if create_tool:
-                    text, due_iso = await extract_todo(message)
                     # Debug logging
-                    import sys
-                    print(f"DEBUG: Extracted todo text: '{text}'", file=sys.stderr, flush=True)
-                    print(f"DEBUG: Extracted due_iso: '{due_iso}'", file=sys.stderr, flush=True)
+                    logger.debug("Extracted todo text: '%s'", text)
+                    logger.debug("Extracted due_iso: '%s'", due_iso)
                     
                     # Notion API format for creating a page in a database:
                     # parent: { database_id: "..." }
@@ -237,207 +773,256 @@ async def run_agent(message: str) -> Tuple[str, List[str], List[str]]:
                     # Ensure text is not empty
                     if not text or not text.strip():
                         text = message.strip()  # Fallback to original message if extraction failed
-                        print(f"DEBUG: Text was empty, using original message: '{text}'", file=sys.stderr, flush=True)
-
-                    # Use correct Notion API format
-                    # Set status to "To Do" by default
-                    # Note: Property names may vary - common names: "Status", "Task Status", "Todo Status"
-                    # If this doesn't work, check your database schema and update the property name
-                    tool_args = {
-                        "parent": {
-                            "database_id": settings.notion_database_id
-                        },
-                        "properties": {
-                            "Name": {  # Most common property name for title
-                                "title": [{"text": {"content": text.strip()}}]
-                            },
-                            "Status": {  # Set status to "To Do" - adjust property name if needed
-                                "select": {
-                                    "name": "To Do"
-                                }
-                            }
-                        }
-                    }
-
-                    # Try alternative property names if "Status" doesn't work
-                    # Uncomment and adjust if needed:
-                    # tool_args["properties"]["Task Status"] = {"select": {"name": "To Do"}}
-                    # tool_args["properties"]["Todo Status"] = {"select": {"name": "To Do"}}
-
-                    # Only add Due Date property if a valid due date was extracted
-                    # Note: This assumes your database has a "Due Date" property
-                    # If your database doesn't have this property, remove this block or adjust the property name
-                    if due_iso and due_iso.strip():
-                        try:
-                            # Validate it's a proper ISO date/datetime
-                            # Parse ISO datetime to date if needed
-                            due_date = due_iso.split("T")[0] if "T" in due_iso else due_iso
-                            # Only add if it's a valid date format (basic check)
-                            if len(due_date) >= 10 and due_date[4] == "-" and due_date[7] == "-":
-                                tool_args["properties"]["Due Date"] = {
-                                    "date": {"start": due_date}
-                                }
-                        except Exception:
-                            # If date parsing fails, just skip adding the Due Date property
-                            pass
-
-                    import sys
-                    print(f"DEBUG: Calling Notion MCP tool '{create_tool.name}' with parent.database_id: {settings.notion_database_id[:10]}...", file=sys.stderr, flush=True)
-                    print(f"DEBUG: Tool args: {json.dumps(tool_args, indent=2)}", file=sys.stderr, flush=True)
+                        logger.debug("Text was empty, using original message: '%s'", text)
+
+                    tool_args = _notion_todo_args(settings.notion_database_id, text.strip(), due_iso)
+
+                    logger.debug(
+                        "Calling Notion MCP tool '%s' with parent.database_id: %.10s...",
+                        create_tool.name,
+                        settings.notion_database_id,
+                    )
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Tool args: %s", orjson.dumps(tool_args).decode())
                     try:
                         result = await create_tool.ainvoke(tool_args)
                         used_tools.append("create_notion_todo")
                         
                         # Debug: log the result type and content
-                        print(f"DEBUG: Result type: {type(result)}", file=sys.stderr, flush=True)
-                        print(f"DEBUG: Result (first 500 chars): {str(result)[:500]}", file=sys.stderr, flush=True)
+                        logger.debug("Result type: %s", type(result))
+                        logger.debug("Result (first 500 chars): %.500s", result)
                         
-                        # Extract URL from result - handle various formats
-                        url = None
-                        result_dict = None
-                        
-                        if isinstance(result, str):
-                            # Try to parse as JSON string
-                            try:
-                                result_dict = json.loads(result)
-                            except json.JSONDecodeError:
-                                # Maybe it's a string representation, try to find JSON in it
-                                start_idx = result.find("{")
-                                end_idx = result.rfind("}")
-                                if start_idx != -1 and end_idx != -1:
-                                    try:
-                                        result_dict = json.loads(result[start_idx:end_idx+1])
-                                    except json.JSONDecodeError:
-                                        pass
-                        
-                        if result_dict is None and isinstance(result, dict):
-                            result_dict = result
-                        
-                        if result_dict:
-                            # Check if this is an error response
-                            if result_dict.get("object") == "error":
-                                error_msg = result_dict.get("message", "Unknown error")
-                                error_code = result_dict.get("code", "")
-                                print(f"DEBUG: Notion API returned error: {error_code} - {error_msg}", file=sys.stderr, flush=True)
-                                # This will be caught by the outer exception handler
-                                raise Exception(f"Notion API error: {error_msg}")
-                            
-                            url = result_dict.get("url")
-                            # Also check if url is nested
-                            if not url and "object" in result_dict:
-                                url = result_dict.get("url")
-                        
-                        print(f"DEBUG: Extracted URL: {url}", file=sys.stderr, flush=True)
+                        url = _extract_url(result)
+                        logger.debug("Extracted URL: %s", url)
                         
                         if url:
                             reply = f"Created todo: {text.strip()}\nGo to Notion: {url}"
                         else:
                             # If no URL but result exists, still report success but note the issue
-                            print(f"DEBUG: WARNING - No URL found in result but call succeeded", file=sys.stderr, flush=True)
+                            logger.warning("No URL found in Notion result but call succeeded")
                             reply = f"Created todo: {text.strip()}"
                     except Exception as e:
                         error_str = str(e)
                         # If error is about a property not existing (e.g., "Due Date"), retry without that property
                         if "is not a property that exists" in error_str or ("validation_error" in error_str.lower() and "property" in error_str.lower()):
-                            import sys
-                            print(f"DEBUG: Property error detected, retrying without Due Date property", file=sys.stderr, flush=True)
+                            logger.debug("Property error detected, retrying without Due Date property")
                             # Remove Due Date property and retry
-                            tool_args_no_due = {
-                                "parent": tool_args["parent"],
-                                "properties": {
-                                    "Name": tool_args["properties"]["Name"],
-                                    "Status": tool_args["properties"]["Status"]
-                                }
-                            }
+                            tool_args["properties"].pop("Due Date", None)
                             try:
-                                result = await create_tool.ainvoke(tool_args_no_due)
+                                result = await create_tool.ainvoke(tool_args)
                                 used_tools.append("create_notion_todo")
                                 
-                                # Extract URL from result - same logic as above
-                                url = None
-                                result_dict = None
-                                
-                                if isinstance(result, str):
-                                    try:
-                                        result_dict = json.loads(result)
-                                    except json.JSONDecodeError:
-                                        start_idx = result.find("{")
-                                        end_idx = result.rfind("}")
-                                        if start_idx != -1 and end_idx != -1:
-                                            try:
-                                                result_dict = json.loads(result[start_idx:end_idx+1])
-                                            except json.JSONDecodeError:
-                                                pass
-                                
-                                if result_dict is None and isinstance(result, dict):
-                                    result_dict = result
-                                
-                                if result_dict:
-                                    # Check if this is an error response
-                                    if result_dict.get("object") == "error":
-                                        error_msg = result_dict.get("message", "Unknown error")
-                                        raise Exception(f"Notion API error: {error_msg}")
-                                    
-                                    url = result_dict.get("url")
-                                
+                                url = _extract_url(result)
+
                                 if url:
                                     reply = f"Created todo: {text.strip()}\nGo to Notion: {url}"
                                 else:
                                     reply = f"Created todo: {text.strip()}"
                             except Exception as e2:
                                 # If retry also fails, fall back to DB
-                                import sys
-                                import traceback
-                                print(f"DEBUG: Notion MCP retry also failed: {e2}", file=sys.stderr, flush=True)
-                                text, due_iso = await extract_todo(message)
-                                result = create_todo_tool(text=text, due_iso=due_iso)
+                                logger.exception("Notion MCP retry also failed: %s", e2)
+                                invalidate_notion_tools_cache(notion_tools)
+                                result = await _create_local_todo(text, due_iso)
                                 used_tools.append("create_todo")
                                 reply = f"Notion MCP failed ({e2}), created in local DB: {result}"
                         else:
                             # Other errors - fall back to DB
-                            import sys
-                            import traceback
-                            print(f"DEBUG: Notion MCP tool call failed: {e}", file=sys.stderr, flush=True)
-                            print(f"DEBUG: Traceback: {traceback.format_exc()}", file=sys.stderr, flush=True)
-                            text, due_iso = await extract_todo(message)
-                            result = create_todo_tool(text=text, due_iso=due_iso)
+                            logger.exception("Notion MCP tool call failed: %s", e)
+                            invalidate_notion_tools_cache(notion_tools)
+                            result = await _create_local_todo(text, due_iso)
                             used_tools.append("create_todo")
                             reply = f"Notion MCP failed ({e}), created in local DB: {result}"
                 else:
                     # Notion MCP available but no create tool found
-                    import sys
-                    print(f"DEBUG: Notion MCP tools available but no create tool found. Available: {tool_names}", file=sys.stderr, flush=True)
-                    text, due_iso = await extract_todo(message)
-                    result = create_todo_tool(text=text, due_iso=due_iso)
+                    logger.warning(
+                        "Notion MCP tools available but no create tool found. Available: %s",
+                        [tool.name for tool in notion_tools],
+                    )
+                    result = await _create_local_todo(text, due_iso)
                     used_tools.append("create_todo")
                     reply = f"Notion MCP configured but no create tool found. Created in local DB: {result}"
             else:
                 # Notion token set but tools couldn't be retrieved
-                import sys
-                print("DEBUG: INTERNAL_INTEGRATION_TOKEN set but get_notion_mcp_tools() returned empty list", file=sys.stderr, flush=True)
-                text, due_iso = await extract_todo(message)
-                result = create_todo_tool(text=text, due_iso=due_iso)
+                logger.warning("INTERNAL_INTEGRATION_TOKEN set but get_notion_mcp_tools() returned empty list")
+                result = await _create_local_todo(text, due_iso)
                 used_tools.append("create_todo")
                 reply = f"Notion MCP configured but connection failed. Created in local DB: {result}"
         else:
             # No Notion MCP configured, use DB
-            text, due_iso = await extract_todo(message)
-            result = create_todo_tool(text=text, due_iso=due_iso)
+            result = await _create_local_todo(text, due_iso)
             used_tools.append("create_todo")
             reply = result if isinstance(result, str) else str(result)
     elif intent == "EVENT":
-        title, start_iso, end_iso = await extract_event(message)
-        result = create_event_tool(
+        title, start, end = _event_from_decision(decision, message)
+        # The DB and Google Calendar clients are blocking; keep them off the event loop.
+        result = await asyncio.to_thread(
+            create_event_tool,
             title=title,
-            start_iso=start_iso,
-            end_iso=end_iso,
+            start=start,
+            end=end,
             description=None,
         )
         used_tools.append("create_event")
         reply = result if isinstance(result, str) else str(result)
-    else:
-        reply, retrieved_doc_ids = answer_with_context_langchain(message)
 
-    return reply, used_tools, retrieved_doc_ids
+    return reply, used_tools
+
+
+# Pending log writes and Notion prefetches, referenced so they aren't
+# garbage-collected mid-flight.
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def _write_conversation_log(
+    message: str, reply: str, used_tools: List[str], retrieved_ids: List[str]
+) -> None:
+    db: Session = SessionLocal()
+    try:
+        log = ConversationLog(
+            user_message=message,
+            assistant_reply=reply,
+            tools_used=",".join(used_tools) if used_tools else None,
+            retrieved_doc_ids=",".join(retrieved_ids) if retrieved_ids else None,
+        )
+        db.add(log)
+        db.commit()
+    finally:
+        db.close()
+
 
+async def _log_conversation(
+    message: str, reply: str, used_tools: List[str], retrieved_ids: List[str]
+) -> None:
+    """Write the conversation log in a worker thread with its own session."""
+    try:
+        await asyncio.to_thread(_write_conversation_log, message, reply, used_tools, retrieved_ids)
+    except Exception:
+        logger.exception("Failed to write conversation log")
+
+
+def _log_in_background(
+    message: str, reply: str, used_tools: List[str], retrieved_ids: List[str]
+) -> None:
+    """Persist the turn off the request path; the reply doesn't depend on it."""
+    task = asyncio.create_task(_log_conversation(message, reply, used_tools, retrieved_ids))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def _recent_questions(limit: int) -> List[str]:
+    """Return the distinct user messages of the latest QA turns, newest first."""
+    log = ConversationLog
+    query = (
+        select(log.user_message)
+        .where(log.tools_used.is_(None))
+        .group_by(log.user_message)
+        .order_by(func.max(log.created_at).desc())
+        .limit(limit)
+    )
+    db: Session = SessionLocal()
+    try:
+        return list(db.execute(query).scalars())
+    finally:
+        db.close()
+
+
+async def warm_up() -> None:
+    """Embed recently asked questions into the disk cache.
+
+    Repeats of them then skip the embedding model from the first request
+    after a restart. Failures are only logged; the cache fills on use anyway.
+    """
+    if not settings.embedding_cache_dir or settings.embedding_warmup_size <= 0:
+        return
+    try:
+        questions = await asyncio.to_thread(_recent_questions, settings.embedding_warmup_size)
+        if questions:
+            await (await _rag()).warm_embedding_cache(questions)
+    except Exception as e:
+        logger.warning("Embedding cache warm-up failed: %s", e)
+
+
+async def run_agent(message: str, db: Optional[Session] = None) -> Tuple[str, List[str], List[str]]:
+    """LangChain-based agent that combines RAG with tool calling.
+
+    ``db`` is the request's session; local tool calls reuse it when given.
+    Every turn is written to the conversation log in the background.
+    """
+    cache_key = f"{index_version()}:{normalized_key(message)}"
+    cached = _reply_cache.get(cache_key)
+    if cached is not None:
+        reply, retrieved_doc_ids = cached
+        _log_in_background(message, reply, [], list(retrieved_doc_ids))
+        return reply, [], list(retrieved_doc_ids)
+
+    decision, retrieval_task, tools_task = await _route(message)
+    if decision["intent"] != "QA":
+        token = _db_session_cv.set(db)
+        try:
+            reply, used_tools = await _run_tool_intent(message, decision, tools_task)
+        finally:
+            _db_session_cv.reset(token)
+        _log_in_background(message, reply, used_tools, [])
+        return reply, used_tools, []
+
+    reply, retrieved_doc_ids = await (await _rag()).answer_with_context_langchain(message, retrieval=retrieval_task)
+    _reply_cache.set(cache_key, (reply, tuple(retrieved_doc_ids)))
+    _log_in_background(message, reply, [], retrieved_doc_ids)
+    return reply, [], retrieved_doc_ids
+
+
+async def stream_agent(message: str) -> AsyncIterator[Tuple[str, Any]]:
+    """Streaming variant of ``run_agent`` yielding (event, data) pairs.
+
+    Events, in order:
+    - ("tool_progress", {"intent", "title"}) when an event's title has been
+      extracted, before its start and end are decoded;
+    - ("tool_start", {"intent"}) once a todo/event tool is about to run;
+    - ("token", text) for each reply chunk (tool replies arrive as one token);
+    - ("meta", {"used_tools", "retrieved_doc_ids"}) after the last token;
+    - ("done", {}) to close the stream.
+
+    Completed turns are written to the conversation log like ``run_agent``'s.
+    """
+    cache_key = f"{index_version()}:{normalized_key(message)}"
+    cached = _reply_cache.get(cache_key)
+    if cached is not None:
+        reply, retrieved_doc_ids = cached
+        _log_in_background(message, reply, [], list(retrieved_doc_ids))
+        yield "token", reply
+        yield "meta", {"used_tools": [], "retrieved_doc_ids": list(retrieved_doc_ids)}
+        yield "done", {}
+        return
+
+    # The route task copies the context at creation, so the sink only
+    # applies to it and is unset again here.
+    progress: asyncio.Queue = asyncio.Queue()
+    token = _progress_cv.set(progress.put_nowait)
+    route_task = asyncio.create_task(_route(message))
+    _progress_cv.reset(token)
+    route_task.add_done_callback(lambda _: progress.put_nowait(None))
+    try:
+        while (update := await progress.get()) is not None:
+            yield "tool_progress", update
+    finally:
+        route_task.cancel()
+    decision, retrieval_task, tools_task = route_task.result()
+    if decision["intent"] != "QA":
+        yield "tool_start", {"intent": decision["intent"]}
+        reply, used_tools = await _run_tool_intent(message, decision, tools_task)
+        _log_in_background(message, reply, used_tools, [])
+        yield "token", reply
+        yield "meta", {"used_tools": used_tools, "retrieved_doc_ids": []}
+        yield "done", {}
+        return
 
+    retrieved_doc_ids, chunks = await (await _rag()).stream_answer_with_context(message, retrieval=retrieval_task)
+    parts: List[str] = []
+    async for chunk in chunks:
+        parts.append(chunk)
+        yield "token", chunk
+    reply = "".join(parts)
+    _reply_cache.set(cache_key, (reply, tuple(retrieved_doc_ids)))
+    _log_in_background(message, reply, [], retrieved_doc_ids)
+    yield "meta", {"used_tools": [], "retrieved_doc_ids": retrieved_doc_ids}
+    yield "done", {}
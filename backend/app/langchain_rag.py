@@ -1,65 +1,283 @@
-from typing import List, Tuple
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from hashlib import sha256
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Sequence, Tuple
 
-from langchain_community.chat_models import ChatOllama
 from langchain_community.embeddings import SentenceTransformerEmbeddings
-from langchain_community.vectorstores import Qdrant as LCQdrant
-from qdrant_client import QdrantClient
+from langchain_core.documents import Document
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_ollama import ChatOllama
+import orjson
+from qdrant_client import AsyncQdrantClient
 
+from .cache import SemanticCache, TTLCache, index_version, normalized_key
 from .config import get_settings
+from .embedding_cache import EmbeddingCache
+from .llm.ollama import client_kwargs as ollama_client_kwargs, preload_model
+from .rag.pipeline import EMBEDDING_MODEL, ONNX_INT8_FILE, SEARCH_PARAMS
 
 
 settings = get_settings()
 
-_embeddings = SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2")
-_client = QdrantClient(url=settings.qdrant_url)
 
-# Tell LangChain which payload key contains the text we stored during ingestion.
-_vectorstore = LCQdrant(
-    client=_client,
-    collection_name=settings.qdrant_collection,
-    embeddings=_embeddings,
-    content_payload_key="text",
+@lru_cache(maxsize=1)
+def _get_embeddings() -> SentenceTransformerEmbeddings:
+    # Loaded on the first cache miss, so workers that only see repeated
+    # questions never load the model.
+    model_kwargs = {}
+    if settings.embedding_backend == "onnx":
+        model_kwargs = {"backend": "onnx", "model_kwargs": {"file_name": ONNX_INT8_FILE}}
+    return SentenceTransformerEmbeddings(model_name=EMBEDDING_MODEL, model_kwargs=model_kwargs)
+
+
+def _embed(question: str) -> List[float]:
+    return _get_embeddings().embed_query(question)
+
+
+if settings.embedding_cache_dir:
+    # Vectors from the two backends differ slightly, so they are cached apart.
+    _embedding_id = EMBEDDING_MODEL
+    if settings.embedding_backend == "onnx":
+        _embedding_id = f"{EMBEDDING_MODEL}/{ONNX_INT8_FILE}"
+    _embed = EmbeddingCache(settings.embedding_cache_dir, _embedding_id).wrap(_embed)
+
+
+# One thread for query encoding: concurrent MiniLM forward passes would only
+# compete for the same cores, and the event loop stays free either way.
+_embed_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed")
+
+
+async def _embed_async(question: str) -> List[float]:
+    return await asyncio.get_running_loop().run_in_executor(_embed_executor, _embed, question)
+
+
+async def warm_embedding_cache(questions: Sequence[str]) -> None:
+    """Embed ``questions`` into the disk cache ahead of their next use.
+
+    One question at a time on the embedding thread, so live queries only
+    ever wait behind a single forward pass; cached questions are cheap hits.
+    """
+    for question in questions:
+        await _embed_async(question)
+
+
+# Searched directly rather than through LangChain's sync vector store, so
+# retrieval doesn't occupy a worker thread while waiting on Qdrant.
+_client = AsyncQdrantClient(url=settings.qdrant_url)
+
+# Recent questions whose embeddings are near-identical reuse the earlier answer.
+_answer_cache = SemanticCache(
+    threshold=settings.semantic_cache_threshold,
+    ttl=settings.response_cache_ttl,
 )
 
-_retriever = _vectorstore.as_retriever(search_kwargs={"k": 5})
+# Exact-match caches: a repeated question skips the embedding forward pass
+# and the Qdrant search, and a repeated (model, context, question) prompt
+# skips the LLM even after it has left the smaller semantic cache.
+_retrieval_cache = TTLCache(maxsize=512, ttl=settings.response_cache_ttl)
+# A near-identical question (by embedding) reuses the earlier search results.
+_semantic_retrieval_cache = SemanticCache(
+    maxsize=512,
+    threshold=settings.semantic_cache_threshold,
+    ttl=settings.response_cache_ttl,
+)
+_prompt_cache = TTLCache(maxsize=settings.response_cache_size, ttl=settings.response_cache_ttl)
 
+# Index stamp the caches above were filled under; see _drop_stale_caches.
+_cached_version = index_version()
 
-def answer_with_context_langchain(question: str) -> Tuple[str, List[str]]:
-    """RAG using LangChain's Qdrant retriever + ChatOllama.
 
-    Returns (reply, retrieved_doc_ids).
+def _drop_stale_caches() -> None:
+    """Empty the answer and retrieval caches if notes were ingested since."""
+    global _cached_version
+    version = index_version()
+    if version != _cached_version:
+        _cached_version = version
+        for cache in (_answer_cache, _retrieval_cache, _semantic_retrieval_cache, _prompt_cache):
+            cache.clear()
+
+
+_llm = ChatOllama(
+    base_url=settings.ollama_base_url,
+    model=settings.llm_model,
+    keep_alive=settings.ollama_keep_alive,
+    client_kwargs=ollama_client_kwargs(),
+)
+
+
+_SYSTEM_MESSAGE = SystemMessage(
+    "You are a concise personal assistant.\n"
+    "Use the provided context only as factual background.\n"
+    "Always answer the user's question directly and do not ask follow-up "
+    "questions about their goals or intentions unless absolutely necessary."
+)
+
+
+async def _search(query_vector: List[float], k: int = 5) -> List[Document]:
+    response = await _client.query_points(
+        collection_name=settings.qdrant_collection,
+        query=query_vector,
+        limit=k,
+        # Only the fields used below; chunk bookkeeping stays on the server.
+        with_payload=["text", "doc_id"],
+        search_params=SEARCH_PARAMS,
+    )
+    # Ingestion stores {"text", "doc_id"} at the top level of the payload.
+    return [
+        Document(
+            page_content=(point.payload or {}).get("text", ""),
+            metadata={"doc_id": (point.payload or {}).get("doc_id", "")},
+        )
+        for point in response.points
+    ]
+
+
+async def retrieve_context(question: str) -> Tuple[List[float], list]:
+    """Embed the question and fetch the top-k documents from Qdrant.
+
+    Returns (query_vector, docs). Embedding is blocking, so it runs on the
+    single embedding thread. Recently retrieved questions are served from cache until
+    the next ingestion, and near-identical ones skip the Qdrant search.
     """
-    # LangChain retrievers in newer versions are Runnable-like and use .invoke;
-    # fall back to get_relevant_documents for older versions.
-    if hasattr(_retriever, "invoke"):
-        docs = _retriever.invoke(question)
+    _drop_stale_caches()
+    key = normalized_key(question)
+    cached = _retrieval_cache.get(key)
+    if cached is not None:
+        return cached
+    query_vector = await _embed_async(question)
+    docs = _semantic_retrieval_cache.get(query_vector)
+    if docs is None:
+        docs = await _search(query_vector)
+        _semantic_retrieval_cache.set(query_vector, docs)
+    result = (query_vector, docs)
+    _retrieval_cache.set(key, result)
+    return result
+
+
+def _format_context(docs: list) -> str:
+    """Render retrieved docs as a compact table for the prompt.
+
+    A ``docs[N]{id,txt}:`` header followed by one ``d-i,"text"`` row per doc,
+    with whitespace collapsed; short ids and no per-doc preamble keep the
+    prompt (and so prefill time) small.
+    """
+    rows = [f"docs[{len(docs)}]{{id,txt}}:"]
+    for idx, doc in enumerate(docs, 1):
+        text = " ".join(doc.page_content.split())
+        rows.append(f"d-{idx},{orjson.dumps(text).decode()}")
+    return "\n".join(rows)
+
+
+# Pending "load the answer model" request, if any; see _preload_llm.
+_preload_task: Optional[asyncio.Task] = None
+
+
+def _preload_llm() -> None:
+    """Ask Ollama to load the answer model without waiting for it.
+
+    Called once a question is known to need an answer, so a cold start
+    overlaps the rest of retrieval instead of following it. At most one
+    request is in flight; the reference keeps it from being collected.
+    """
+    global _preload_task
+    if _preload_task is None or _preload_task.done():
+        _preload_task = asyncio.create_task(
+            preload_model(settings.llm_model, settings.ollama_keep_alive)
+        )
+
+
+def _prompt_key(context: str, question: str) -> str:
+    return sha256(f"{settings.llm_model}\0{context}\0{question}".encode("utf-8")).hexdigest()
+
+
+async def _prepare_answer(
+    question: str,
+    retrieval: Optional[Awaitable[Tuple[List[float], list]]],
+) -> Tuple[Callable[[str], None], Optional[Tuple[str, Tuple[str, ...]]], list, List[str]]:
+    """Return (store, cached_answer, messages, retrieved_ids) for a question.
+
+    ``store(reply)`` records a freshly generated reply in the answer caches.
+    """
+    _drop_stale_caches()
+    _preload_llm()
+    # Embed once and use the vector both for the cache lookup and the search.
+    docs = None
+    if retrieval is not None:
+        query_vector, docs = await retrieval
+    elif (recent := _retrieval_cache.get(normalized_key(question))) is not None:
+        query_vector, docs = recent
     else:
-        docs = _retriever.get_relevant_documents(question)
-    context = "\n\n".join(doc.page_content for doc in docs)
+        query_vector = await _embed_async(question)
+    cached = _answer_cache.get(query_vector)
+    if cached is not None:
+        return lambda reply: None, cached, [], list(cached[1])
+
+    if docs is None:
+        docs = await _search(query_vector)
+        _retrieval_cache.set(normalized_key(question), (query_vector, docs))
+    context = _format_context(docs)
     retrieved_ids: List[str] = [
         str(doc.metadata.get("doc_id", "")) for doc in docs
     ]
 
-    system_prompt = (
-        "You are a concise personal assistant.\n"
-        "Use the provided context only as factual background.\n"
-        "Always answer the user's question directly and do not ask follow-up "
-        "questions about their goals or intentions unless absolutely necessary."
-    )
+    prompt_key = _prompt_key(context, question)
+    cached = _prompt_cache.get(prompt_key)
+    if cached is not None:
+        return lambda reply: None, cached, [], list(cached[1])
 
-    llm = ChatOllama(
-        base_url=settings.ollama_base_url,
-        model=settings.llm_model,
-    )
+    def store(reply: str) -> None:
+        value = (reply, tuple(retrieved_ids))
+        _answer_cache.set(query_vector, value)
+        _prompt_cache.set(prompt_key, value)
 
     messages = [
-        ("system", system_prompt),
-        (
-            "user",
-            f"Context:\n{context}\n\nQuestion: {question}",
-        ),
+        _SYSTEM_MESSAGE,
+        HumanMessage(f"Context:\n{context}\n\nQuestion: {question}"),
     ]
+    return store, None, messages, retrieved_ids
 
-    response = llm.invoke(messages)
+
+async def answer_with_context_langchain(
+    question: str,
+    retrieval: Optional[Awaitable[Tuple[List[float], list]]] = None,
+) -> Tuple[str, List[str]]:
+    """RAG using LangChain's Qdrant retriever + ChatOllama.
+
+    ``retrieval`` may be a pending ``retrieve_context(question)`` started
+    earlier by the caller. Returns (reply, retrieved_doc_ids).
+    """
+    store, cached, messages, retrieved_ids = await _prepare_answer(question, retrieval)
+    if cached is not None:
+        return cached[0], retrieved_ids
+
+    response = await _llm.ainvoke(messages)
     reply = response.content if hasattr(response, "content") else str(response)
+    store(reply)
     return reply, retrieved_ids
+
+
+async def stream_answer_with_context(
+    question: str,
+    retrieval: Optional[Awaitable[Tuple[List[float], list]]] = None,
+) -> Tuple[List[str], AsyncIterator[str]]:
+    """Streaming variant of ``answer_with_context_langchain``.
+
+    Returns (retrieved_doc_ids, chunks) where ``chunks`` yields the reply
+    text as Ollama generates it.
+    """
+    store, cached, messages, retrieved_ids = await _prepare_answer(question, retrieval)
+
+    async def chunks() -> AsyncIterator[str]:
+        if cached is not None:
+            yield cached[0]
+            return
+        parts: List[str] = []
+        async for chunk in _llm.astream(messages):
+            text = chunk.content if hasattr(chunk, "content") else str(chunk)
+            if text:
+                parts.append(text)
+                yield text
+        store("".join(parts))
+
+    return retrieved_ids, chunks()
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from sqlalchemy.orm import Session
@@ -10,9 +10,19 @@ from .tools import calendar as calendar_tools
 from .tools import todos as todo_tools
 
 
-def create_todo_tool(text: str, due_iso: Optional[str] = None) -> str:
-    """Create a todo item using the existing DB-backed implementation."""
-    db: Session = SessionLocal()
+def create_todo_tool(
+    text: str,
+    due_iso: Optional[str] = None,
+    db: Optional[Session] = None,
+) -> str:
+    """Create a todo item using the existing DB-backed implementation.
+
+    Uses ``db`` when the caller already holds a session for the request;
+    otherwise opens (and closes) its own.
+    """
+    owns_session = db is None
+    if owns_session:
+        db = SessionLocal()
     try:
         due_at: Optional[datetime] = None
         if due_iso:
@@ -25,13 +35,20 @@ def create_todo_tool(text: str, due_iso: Optional[str] = None) -> str:
         due_str = todo.due_at.isoformat() if todo.due_at else "no due date"
         return f"Created todo #{todo.id}: '{todo.text}' (due: {due_str})."
     finally:
-        db.close()
+        if owns_session:
+            db.close()
+
+
+_MONTH_ABBR = ("Jan", "Feb", "Mar", "Apr", "May", "Jun",
+               "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
 
 
 def _format_human_datetime_range(start: datetime, end: datetime) -> str:
-    """Return a human-friendly description like 'tomorrow, 11pm–12am'."""
-    from datetime import timedelta
-    now = datetime.now()
+    """Return a human-friendly description like 'tomorrow, 11pm–12am'.
+
+    ``start`` and ``end`` are naive UTC, so "today" is the UTC date too.
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
     start_date = start.date()
     today = now.date()
     tomorrow = today + timedelta(days=1)
@@ -42,17 +59,15 @@ def _format_human_datetime_range(start: datetime, end: datetime) -> str:
         date_label = "tomorrow"
     else:
         # Format as 'Nov 15' - use day without leading zero
-        day = start.day
-        date_label = start.strftime(f"%b {day}")  # e.g. 'Nov 15'
+        date_label = f"{_MONTH_ABBR[start.month - 1]} {start.day}"
 
     def fmt_time(dt: datetime) -> str:
-        # e.g. '11:00pm' or '3pm'
-        hour = dt.strftime("%I").lstrip("0") or "12"  # Handle hour 0 (midnight)
-        minute = dt.strftime("%M")
-        ampm = dt.strftime("%p").lower()
-        if minute == "00":
+        # e.g. '11:30pm' or '3pm'; plain arithmetic avoids locale-aware strftime
+        hour = dt.hour % 12 or 12
+        ampm = "am" if dt.hour < 12 else "pm"
+        if dt.minute == 0:
             return f"{hour}{ampm}"
-        return f"{hour}:{minute}{ampm}"
+        return f"{hour}:{dt.minute:02d}{ampm}"
 
     start_str = fmt_time(start)
     end_str = fmt_time(end)
@@ -61,14 +76,11 @@ def _format_human_datetime_range(start: datetime, end: datetime) -> str:
 
 def create_event_tool(
     title: str,
-    start_iso: str,
-    end_iso: str,
+    start: datetime,
+    end: datetime,
     description: Optional[str] = None,
 ) -> str:
     """Create a Google Calendar event using the existing implementation."""
-    start = datetime.fromisoformat(start_iso)
-    end = datetime.fromisoformat(end_iso)
-
     event = calendar_tools.create_event(
         title=title,
         start=start,
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import AsyncIterator, List
 
 
 class LLMProvider(ABC):
@@ -10,4 +10,10 @@ class LLMProvider(ABC):
         """Generate a reply given a list of chat messages."""
         raise NotImplementedError
 
+    async def astream(self, messages: List[dict]) -> AsyncIterator[str]:
+        """Yield the reply in chunks as it is generated.
 
+        Providers that cannot stream inherit this default, which yields the
+        whole reply from ``generate`` at once.
+        """
+        yield await self.generate(messages)
@@ -1,10 +1,54 @@
-from typing import List
+import logging
+from typing import AsyncIterator, List, Optional
 
 import httpx
+import orjson
 
 from ..config import get_settings
 from .base import LLMProvider
 
+logger = logging.getLogger(__name__)
+
+# Shared by every Ollama client in the app: fail fast when Ollama is down,
+# but leave generation plenty of time, and keep warm connections pooled.
+HTTP_TIMEOUT = httpx.Timeout(60.0, connect=1.0)
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64)
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the process-wide pooled httpx client for the Ollama API."""
+    global _client
+    if _client is None or _client.is_closed:
+        settings = get_settings()
+        _client = httpx.AsyncClient(
+            base_url=settings.ollama_base_url,
+            timeout=HTTP_TIMEOUT,
+            limits=HTTP_LIMITS,
+        )
+    return _client
+
+
+async def preload_model(model: str, keep_alive: str) -> None:
+    """Ask Ollama to load ``model`` into memory without generating anything.
+
+    Returns immediately if the model is already resident. Failures are only
+    logged: the real request will surface them.
+    """
+    try:
+        response = await get_http_client().post(
+            "/api/generate", json={"model": model, "keep_alive": keep_alive}
+        )
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        logger.debug("Ollama preload of %s failed: %s", model, e)
+
+
+def client_kwargs() -> dict:
+    """httpx options for LangChain's ChatOllama so it pools connections the same way."""
+    return {"timeout": HTTP_TIMEOUT, "limits": HTTP_LIMITS}
+
 
 class OllamaProvider(LLMProvider):
     """LLM provider that calls a local Ollama instance."""
@@ -14,17 +58,31 @@ class OllamaProvider(LLMProvider):
         self.base_url = settings.ollama_base_url
         self.model = settings.llm_model
 
-    async def generate(self, messages: List[dict]) -> str:
-        async with httpx.AsyncClient(base_url=self.base_url, timeout=60.0) as client:
-            response = await client.post(
-                "/v1/chat/completions",
-                json={
-                    "model": self.model,
-                    "messages": messages,
-                },
-            )
+    async def astream(self, messages: List[dict]) -> AsyncIterator[str]:
+        """Stream the reply from Ollama's native ``/api/chat`` NDJSON endpoint."""
+        settings = get_settings()
+        async with get_http_client().stream(
+            "POST",
+            "/api/chat",
+            json={
+                "model": self.model,
+                "messages": messages,
+                "stream": True,
+                "keep_alive": settings.ollama_keep_alive,
+            },
+        ) as response:
             response.raise_for_status()
-            data = response.json()
-            return data["choices"][0]["message"]["content"]
-
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                chunk = orjson.loads(line)
+                if "error" in chunk:
+                    raise RuntimeError(f"Ollama error: {chunk['error']}")
+                text = chunk.get("message", {}).get("content")
+                if text:
+                    yield text
+                if chunk.get("done"):
+                    break
 
+    async def generate(self, messages: List[dict]) -> str:
+        return "".join([part async for part in self.astream(messages)])
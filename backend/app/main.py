@@ -1,19 +1,48 @@
-from typing import List, Optional
+import asyncio
+from contextlib import asynccontextmanager
+import hmac
+import logging
+from typing import List, Literal, Optional
 from pathlib import Path
 
 from fastapi import Depends, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
+import orjson
 
-from .config import Settings, get_settings
+from .config import get_settings
 from .db import get_db
 from .schemas import ChatRequest, ChatResponse, TodoRead
 from .tools.todos import list_todos
-from .langchain_agent import run_agent
+from .langchain_agent import run_agent, stream_agent, warm_up
+from .mcp_clients import close_notion_session
+from .rag.pipeline import ensure_collection
 from sqlalchemy.orm import Session
 
 
-app = FastAPI(title="Personal Assistant API", version="0.1.0")
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create the Qdrant collection once here rather than checking on every query.
+    try:
+        await asyncio.to_thread(ensure_collection)
+    except Exception as e:
+        logger.warning("Could not initialise the Qdrant collection: %s", e)
+    # Runs alongside the first requests rather than delaying startup.
+    warm_up_task = asyncio.create_task(warm_up())
+    yield
+    warm_up_task.cancel()
+    # Stop the long-lived Notion MCP container along with the app.
+    await close_notion_session()
+
+
+app = FastAPI(title="Personal Assistant API", version="0.1.0", lifespan=lifespan)
+# Settings are frozen, so the token is bound once instead of resolving the
+# settings dependency on every chat request.
+app.state.api_token = get_settings().api_token
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,19 +58,67 @@ def health() -> dict:
     return {"status": "ok"}
 
 
+def _check_api_token(payload: ChatRequest) -> None:
+    """Reject the request unless it carries the configured API token."""
+    expected = app.state.api_token
+    # compare_digest takes the same time wherever the strings differ.
+    if expected and not hmac.compare_digest(
+        (payload.api_token or "").encode("utf-8"), expected.encode("utf-8")
+    ):
+        raise HTTPException(status_code=401, detail="Invalid API token")
+
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat(
     payload: ChatRequest,
-    settings: Settings = Depends(get_settings),
+    db: Session = Depends(get_db),
 ) -> ChatResponse:
     """Chat endpoint using LangChain for RAG + tool calling with MCP clients."""
-    if settings.api_token and payload.api_token != settings.api_token:
-        raise HTTPException(status_code=401, detail="Invalid API token")
+    _check_api_token(payload)
 
-    reply, used_tools, retrieved_ids = await run_agent(payload.message)
+    reply, used_tools, retrieved_ids = await run_agent(payload.message, db=db)
     return ChatResponse(reply=reply, used_tools=used_tools, retrieved_doc_ids=retrieved_ids)
 
 
+# Short type tags for the JSONL stream framing.
+_JSONL_TYPES = {
+    "token": "tok",
+    "tool_progress": "prog",
+    "tool_start": "tool",
+    "meta": "meta",
+    "done": "done",
+}
+
+
+@app.post("/chat/stream")
+async def chat_stream(
+    payload: ChatRequest,
+    format: Literal["sse", "jsonl"] = "sse",
+) -> StreamingResponse:
+    """Chat endpoint that streams the reply as it is generated.
+
+    Emits ``tool_progress`` once an event's title is known,
+    ``tool_start`` when a todo/event tool runs, ``token`` events with
+    JSON-encoded text chunks, a ``meta`` event with ``used_tools`` and
+    ``retrieved_doc_ids``, and a final ``done``. With ``?format=jsonl`` each
+    event is one JSON line instead, e.g. ``{"t":"tok","v":"Hello"}``.
+    """
+    _check_api_token(payload)
+
+    if format == "jsonl":
+        async def events():
+            async for event, data in stream_agent(payload.message):
+                yield orjson.dumps({"t": _JSONL_TYPES[event], "v": data}) + b"\n"
+
+        return StreamingResponse(events(), media_type="application/x-ndjson")
+
+    async def events():
+        async for event, data in stream_agent(payload.message):
+            yield f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
 @app.get("/todos", response_model=List[TodoRead])
 def get_todos(
     status: Optional[str] = None,
@@ -52,7 +129,7 @@ def get_todos(
 
 
 # Serve the simple frontend at root URL
-# API routes (/chat, /health, /todos) are checked before static files, so they take precedence
+# API routes (/chat, /chat/stream, /health, /todos) are checked before static files, so they take precedence
 static_dir = Path(__file__).parent / "static"
 if static_dir.exists():
     app.mount("/", StaticFiles(directory=str(static_dir), html=True), name="static")
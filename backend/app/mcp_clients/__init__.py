@@ -3,6 +3,7 @@
 This module provides a dynamic registry for MCP clients, making it easy to add
 new MCP integrations as the project grows.
 """
+import logging
 from typing import Dict, List, Optional, Any
 
 # Type hint for LangChain tools (avoid import if not available for linting)
@@ -11,6 +12,8 @@ try:
 except ImportError:
     BaseTool = Any  # Fallback for type hints
 
+logger = logging.getLogger(__name__)
+
 
 class MCPClientRegistry:
     """Registry for managing multiple MCP clients dynamically."""
@@ -41,9 +44,7 @@ class MCPClientRegistry:
                     all_tools.extend(tools)
             except Exception as e:
                 # Log error but continue with other clients
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.warning(f"Failed to get tools from MCP client '{name}': {e}")
+                logger.warning("Failed to get tools from MCP client '%s': %s", name, e)
         return all_tools
 
     async def get_tools(self, client_name: str) -> List[BaseTool]:
@@ -60,9 +61,7 @@ class MCPClientRegistry:
         try:
             return await self._clients[client_name]()
         except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.warning(f"Failed to get tools from MCP client '{client_name}': {e}")
+            logger.warning("Failed to get tools from MCP client '%s': %s", client_name, e)
             return []
 
     def list_clients(self) -> List[str]:
@@ -74,9 +73,21 @@ class MCPClientRegistry:
 registry = MCPClientRegistry()
 
 # Auto-register available MCP clients
-from .notion import get_notion_mcp_tools
+from .notion import (
+    close_notion_session,
+    find_notion_create_tool,
+    get_notion_mcp_tools,
+    invalidate_notion_tools_cache,
+)
 
 registry.register("notion", get_notion_mcp_tools)
 
-__all__ = ["registry", "MCPClientRegistry", "get_notion_mcp_tools"]
+__all__ = [
+    "registry",
+    "MCPClientRegistry",
+    "get_notion_mcp_tools",
+    "find_notion_create_tool",
+    "invalidate_notion_tools_cache",
+    "close_notion_session",
+]
 
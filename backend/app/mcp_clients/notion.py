@@ -3,39 +3,111 @@
 This module connects to the Notion MCP server running in Docker via stdio transport
 and exposes LangChain-compatible tools for creating and managing todos.
 """
+import asyncio
 import json
 import logging
-from typing import List
+from functools import lru_cache
+from typing import List, Optional, Tuple
 
 from langchain_mcp_adapters.client import MultiServerMCPClient
+from langchain_mcp_adapters.tools import load_mcp_tools
 
 from ..config import get_settings
 
 logger = logging.getLogger(__name__)
 
+# The open MCP session as (tools, holder task, close event). Tools loaded
+# from a session call back into it, so each tool call is one stdio
+# round-trip to a container that is already running instead of a fresh
+# `docker run`. The tool list is reused for exactly as long as its session
+# lives: it is reloaded only after invalidate_notion_tools_cache() or once
+# the session has died. The lock makes concurrent misses share one handshake.
+_session: Optional[Tuple[List, asyncio.Task, asyncio.Event]] = None
+_tools_lock = asyncio.Lock()
+
+
+def _live_tools() -> Optional[List]:
+    """Return the open session's tools, or None if no session is alive."""
+    if _session is None or _session[1].done():
+        return None
+    return _session[0]
+
 
 async def get_notion_mcp_tools() -> List:
     """Get LangChain tools from the Notion MCP server.
 
-    Returns a list of LangChain tools that can be used in agents.
-    If Notion is not configured, returns an empty list.
+    The tools stay valid while their session is open, so they are reused
+    until it ends. Failed or empty fetches are not kept. Call
+    ``invalidate_notion_tools_cache(tools)`` when a tool stops working.
+    """
+    tools = _live_tools()
+    if tools is not None:
+        return tools
+    async with _tools_lock:
+        tools = _live_tools()
+        if tools is None:
+            tools = await _load_notion_mcp_tools()
+    return tools
 
-    Returns:
-        List of LangChain tools from the Notion MCP server
+
+def invalidate_notion_tools_cache(tools: Optional[List] = None) -> None:
+    """Close the Notion MCP session so the next call reconnects.
+
+    Pass the ``tools`` that failed: if they came from a session that has
+    already been replaced, the newer session is left alone, so a burst of
+    requests failing on one dead session reconnects only once.
     """
-    settings = get_settings()
-    token = settings.notion_integration_token
-    db_id = settings.notion_database_id
+    if tools is not None and (_session is None or tools is not _session[0]):
+        return
+    _end_session()
+
+
+async def _hold_session(client: MultiServerMCPClient, ready: asyncio.Future, closed: asyncio.Event) -> None:
+    """Keep one Notion MCP session open until ``closed`` is set.
+
+    The stdio transport must be entered and exited by the same task, so the
+    session lives in its own task rather than in whichever request opened it.
+    """
+    try:
+        async with client.session("notion") as session:
+            ready.set_result(await load_mcp_tools(session))
+            await closed.wait()
+    except Exception as e:
+        if not ready.done():
+            ready.set_exception(e)
+        else:
+            logger.warning("Notion MCP session ended: %s", e)
 
-    if not token or not db_id:
-        logger.debug("Notion MCP not fully configured (token or DB ID missing). Skipping.")
-        return []
 
-    token = token.strip()
-    token_preview = token[:10] + "..." if token else "None"
-    logger.debug(f"Using Notion token starting with: {token_preview}")
-    logger.debug(f"Token length: {len(token) if token else 0}")
-    logger.debug(f"Notion Database ID: {db_id}")
+def _end_session() -> None:
+    """Ask the open session, if any, to close; its task exits on its own."""
+    global _session
+    if _session is not None:
+        _session[2].set()
+        _session = None
+
+
+async def close_notion_session() -> None:
+    """Close the Notion MCP session and wait for the container to exit."""
+    task = _session[1] if _session is not None else None
+    _end_session()
+    if task is not None:
+        await asyncio.gather(task, return_exceptions=True)
+
+
+@lru_cache(maxsize=1)
+def _server_config() -> dict:
+    """Return the stdio connection config for the Notion MCP server.
+
+    Settings are frozen, so the headers JSON and docker arguments are built
+    (and the token format checked) once per process rather than per session.
+    """
+    settings = get_settings()
+    token = settings.notion_integration_token.strip()
+    db_id = settings.notion_database_id
+    logger.debug("Using Notion token starting with: %.10s...", token)
+    logger.debug("Token length: %d", len(token))
+    logger.debug("Notion Database ID: %s", db_id)
 
     # Check token format
     if not (token.startswith("secret_") or token.startswith("ntn_")):
@@ -47,37 +119,112 @@ async def get_notion_mcp_tools() -> List:
         "Notion-Version": "2022-06-28"
     })
 
-    docker_args = [
-        "run",
-        "--rm",
-        "-i",
-        "-e",
-        f"OPENAPI_MCP_HEADERS={openapi_headers}",
-        "mcp/notion",
-    ]
-    logger.debug(f"Docker command: docker {' '.join(docker_args[:4])} OPENAPI_MCP_HEADERS=***")
-
-    client = MultiServerMCPClient(
-        {
-            "notion": {
-                "transport": "stdio",
-                "command": "docker",
-                "args": docker_args,
-                "env": {
-                    "NOTION_DATABASE_ID": db_id  # Pass DB ID as env var to MCP server
-                }
-            }
+    if settings.notion_mcp_container:
+        # Start the server inside the already running compose container:
+        # no image resolution, network setup or container shim per session.
+        docker_args = [
+            "exec",
+            "-i",
+            "-e",
+            f"OPENAPI_MCP_HEADERS={openapi_headers}",
+            settings.notion_mcp_container,
+            *settings.notion_mcp_command.split(),
+        ]
+    else:
+        docker_args = [
+            "run",
+            "--rm",
+            "-i",
+            "-e",
+            f"OPENAPI_MCP_HEADERS={openapi_headers}",
+            "mcp/notion",
+        ]
+    logger.debug("Docker command: docker %s OPENAPI_MCP_HEADERS=***", " ".join(docker_args[:3]))
+
+    return {
+        "transport": "stdio",
+        "command": "docker",
+        "args": docker_args,
+        "env": {
+            "NOTION_DATABASE_ID": db_id  # Pass DB ID as env var to MCP server
         }
-    )
+    }
+
+
+async def _load_notion_mcp_tools() -> List:
+    """Get LangChain tools from the Notion MCP server.
+
+    Returns a list of LangChain tools that can be used in agents.
+    If Notion is not configured, returns an empty list.
+
+    Returns:
+        List of LangChain tools from the Notion MCP server
+    """
+    global _session
+    settings = get_settings()
+    if not settings.notion_integration_token or not settings.notion_database_id:
+        logger.debug("Notion MCP not fully configured (token or DB ID missing). Skipping.")
+        return []
 
+    client = MultiServerMCPClient({"notion": _server_config()})
+
+    # Tools from a previous session would outlive it; replace it outright.
+    await close_notion_session()
+    ready = asyncio.get_running_loop().create_future()
+    closed = asyncio.Event()
+    task = asyncio.create_task(_hold_session(client, ready, closed))
     try:
         logger.debug("Attempting to connect to Notion MCP server via Docker...")
-        tools = await client.get_tools()
-        logger.debug(f"Successfully retrieved {len(tools)} tools from Notion MCP")
-        if tools:
-            logger.debug(f"Tool names: {[t.name for t in tools]}")
-        return tools
+        tools = await asyncio.shield(ready)
+    except asyncio.CancelledError:
+        closed.set()
+        raise
     except Exception as e:
-        logger.error(f"Could not connect to Notion MCP server: {e}", exc_info=True)
+        logger.error("Could not connect to Notion MCP server: %s", e, exc_info=True)
         return []
+    logger.debug("Successfully retrieved %d tools from Notion MCP", len(tools))
+    if not tools:
+        # Nothing to call back into; don't keep the container running.
+        closed.set()
+        return tools
+    _session = (tools, task, closed)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Tool names: %s", [t.name for t in tools])
+    return tools
+
+
+_CREATE_EXCLUDE = ("comment", "update", "delete")
+
+
+@lru_cache(maxsize=8)
+def _pick_create_tool_name(tool_names: Tuple[str, ...]) -> Optional[str]:
+    """Return the name of the tool that creates a page, or None.
 
+    The MCP server exposes the same tools every session, so the choice is
+    memoized on the tuple of tool names.
+    """
+    lowered = [(name, name.lower()) for name in tool_names]
+    # Priority 1: "post-page" (HTTP POST = create), e.g. "API-post-page"
+    for name, lower in lowered:
+        if "post" in lower and "page" in lower:
+            return name
+    # Priority 2: "create" + "page", but not comment/update/delete tools
+    for name, lower in lowered:
+        if "create" in lower and "page" in lower and not any(w in lower for w in _CREATE_EXCLUDE):
+            return name
+    return None
+
+
+def find_notion_create_tool(tools: List) -> Optional[object]:
+    """Return the Notion tool that creates a page in a database, or None.
+
+    Args:
+        tools: Tools returned by ``get_notion_mcp_tools()``
+
+    Returns:
+        The matching LangChain tool, or None if the server exposes none
+    """
+    name = _pick_create_tool_name(tuple(tool.name for tool in tools))
+    if name is None:
+        return None
+    return next(tool for tool in tools if tool.name == name)
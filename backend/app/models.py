@@ -1,6 +1,4 @@
-from datetime import datetime
-
-from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy import Column, DateTime, Index, Integer, String, func
 
 from .db import Base
 
@@ -12,7 +10,10 @@ class Todo(Base):
     text = Column(String, nullable=False)
     due_at = Column(DateTime, nullable=True)
     status = Column(String, nullable=False, default="open")
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    # Serves list_todos' status filter and newest-first order without a sort.
+    __table_args__ = (Index("ix_todos_status_created", status, created_at.desc()),)
 
 
 class ConversationLog(Base):
@@ -21,7 +22,7 @@ class ConversationLog(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_message = Column(String, nullable=False)
     assistant_reply = Column(String, nullable=False)
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     tools_used = Column(String, nullable=True)  # comma-separated list for simplicity
     retrieved_doc_ids = Column(String, nullable=True)
 
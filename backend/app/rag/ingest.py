@@ -1,27 +1,46 @@
+import asyncio
 import os
 from pathlib import Path
 
-from .pipeline import store_document
+from .pipeline import store_documents
 
+# Reads in flight at once; enough to keep the disk queue full.
+_MAX_CONCURRENT_READS = 64
 
-def ingest_notes(notes_dir: str = "notes") -> None:
+
+async def _read_notes(paths: list) -> list:
+    """Read all ``paths`` concurrently, in worker threads."""
+    semaphore = asyncio.Semaphore(_MAX_CONCURRENT_READS)
+
+    async def read(path: Path) -> str:
+        async with semaphore:
+            return await asyncio.to_thread(path.read_text, encoding="utf-8")
+
+    return await asyncio.gather(*(read(path) for path in paths))
+
+
+async def ingest_notes(notes_dir: str = "notes") -> None:
     base = Path(notes_dir)
     if not base.exists():
         print(f"Notes directory {base} does not exist, skipping.")
         return
 
+    paths = []
     for root, _, files in os.walk(base):
         for name in files:
-            if not name.lower().endswith((".md", ".txt")):
-                continue
-            path = Path(root) / name
-            text = path.read_text(encoding="utf-8")
-            doc_id = str(path.relative_to(base))
-            store_document(doc_id, text)
-            print(f"Ingested {doc_id}")
+            if name.lower().endswith((".md", ".txt")):
+                paths.append(Path(root) / name)
+    if not paths:
+        return
 
+    texts = await _read_notes(paths)
+    doc_ids = [str(path.relative_to(base)) for path in paths]
 
-if __name__ == "__main__":
-    ingest_notes()
+    # One batched forward pass and one upload for all notes.
+    await asyncio.to_thread(store_documents, doc_ids, texts)
+    for doc_id in doc_ids:
+        print(f"Ingested {doc_id}")
 
 
+if __name__ == "__main__":
+    asyncio.run(ingest_notes())
@@ -1,96 +1,193 @@
-from typing import List, Tuple
-from uuid import uuid4
+from typing import TYPE_CHECKING, List, Optional, Sequence
+from uuid import NAMESPACE_URL, uuid5
 
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import Filter, PointStruct, VectorParams
-from sentence_transformers import SentenceTransformer
-
+from qdrant_client.http.models import (
+    FieldCondition,
+    Filter,
+    FilterSelector,
+    IsEmptyCondition,
+    MatchValue,
+    PayloadField,
+    QuantizationSearchParams,
+    Range,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    SearchParams,
+    VectorParams,
+)
+
+from ..cache import bump_index_version
 from ..config import get_settings
-from ..llm.ollama import OllamaProvider
 
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
 
-settings = get_settings()
-_embedder: SentenceTransformer | None = None
 
+settings = get_settings()
 
-def get_embedder() -> SentenceTransformer:
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+# int8 export shipped in the model repo, used when EMBEDDING_BACKEND=onnx;
+# ORT uses VNNI instructions where the CPU has them and plain int8 kernels
+# otherwise.
+ONNX_INT8_FILE = "onnx/model_qint8_avx512_vnni.onnx"
+# Output size of EMBEDDING_MODEL; known up front so the collection can be
+# created at startup without loading the model.
+EMBEDDING_DIM = 384
+
+# Vectors are searched as int8 copies kept in RAM (4x smaller than float32);
+# the float32 originals stay on disk and rescore the oversampled top hits.
+QUANTIZATION = ScalarQuantization(
+    scalar=ScalarQuantizationConfig(type="int8", always_ram=True),
+)
+SEARCH_PARAMS = SearchParams(
+    quantization=QuantizationSearchParams(rescore=True, oversampling=2.0),
+)
+
+_embedder: Optional["SentenceTransformer"] = None
+_qdrant: Optional[QdrantClient] = None
+_collection_ready = False
+
+
+def get_embedder() -> "SentenceTransformer":
     global _embedder
     if _embedder is None:
-        _embedder = SentenceTransformer("all-MiniLM-L6-v2")
+        # Imported here so the API can import this module (for startup
+        # collection setup) without loading Torch.
+        from sentence_transformers import SentenceTransformer
+
+        if settings.embedding_backend == "onnx":
+            _embedder = SentenceTransformer(
+                EMBEDDING_MODEL, backend="onnx", model_kwargs={"file_name": ONNX_INT8_FILE}
+            )
+        else:
+            _embedder = SentenceTransformer(EMBEDDING_MODEL)
     return _embedder
 
 
 def get_qdrant() -> QdrantClient:
-    return QdrantClient(url=settings.qdrant_url)
+    """Return the process-wide Qdrant client, talking gRPC on Qdrant's port 6334."""
+    global _qdrant
+    if _qdrant is None:
+        _qdrant = QdrantClient(url=settings.qdrant_url, prefer_grpc=True)
+    return _qdrant
+
+
+def _has_quantization(config) -> bool:
+    """Whether a collection ``config`` already carries ``QUANTIZATION``."""
+    current = config.quantization_config
+    return (
+        isinstance(current, ScalarQuantization)
+        and current.scalar.type == QUANTIZATION.scalar.type
+        and current.scalar.always_ram == QUANTIZATION.scalar.always_ram
+    )
 
 
 def ensure_collection() -> None:
+    """Create the notes collection unless it exists; checks Qdrant once per process."""
+    global _collection_ready
+    if _collection_ready:
+        return
     client = get_qdrant()
-    if settings.qdrant_collection not in [
-        c.name for c in client.get_collections().collections
-    ]:
-        dim = get_embedder().get_sentence_embedding_dimension()
-        client.recreate_collection(
+    # Checked up front: a "create" conflict surfaces as an HTTP 409 over REST
+    # but as a gRPC ALREADY_EXISTS status over gRPC.
+    if not client.collection_exists(settings.qdrant_collection):
+        try:
+            client.create_collection(
+                collection_name=settings.qdrant_collection,
+                vectors_config=VectorParams(size=EMBEDDING_DIM, distance="Cosine", on_disk=True),
+                quantization_config=QUANTIZATION,
+            )
+        except Exception:
+            # Lost a race with another process (the API starting while
+            # ingestion runs); the error type depends on the transport, so
+            # ask again instead of matching it.
+            if not client.collection_exists(settings.qdrant_collection):
+                raise
+    elif not _has_quantization(client.get_collection(settings.qdrant_collection).config):
+        # Collections created before quantization get it added in place;
+        # the update triggers an optimizer pass, so it only runs when needed.
+        client.update_collection(
             collection_name=settings.qdrant_collection,
-            vectors_config=VectorParams(size=dim, distance="Cosine"),
+            quantization_config=QUANTIZATION,
         )
+    _collection_ready = True
 
 
-def store_document(doc_id: str, text: str) -> None:
-    ensure_collection()
-    client = get_qdrant()
-    embedder = get_embedder()
-    vector = embedder.encode(text).tolist()
-    # Qdrant IDs must be unsigned integers or UUIDs. We store the original
-    # document identifier in the payload and use a generated UUID as the point ID.
-    point = PointStruct(
-        id=str(uuid4()),
-        vector=vector,
-        payload={"text": text, "doc_id": doc_id},
-    )
-    client.upsert(collection_name=settings.qdrant_collection, points=[point])
+def chunk_text(text: str, size: int = 1200, overlap: int = 200) -> List[str]:
+    """Split ``text`` into overlapping windows of at most ``size`` characters.
 
+    About 300 tokens each, so MiniLM (256-token limit) sees most of every
+    chunk instead of silently truncating a whole note.
+    """
+    step = size - overlap
+    chunks = []
+    for start in range(0, max(len(text) - overlap, 1), step):
+        chunk = text[start:start + size].strip()
+        if chunk:
+            chunks.append(chunk)
+    return chunks
+
+
+def _point_id(doc_id: str, chunk_idx: int) -> str:
+    # Deterministic, so re-ingesting a note overwrites its points.
+    return str(uuid5(NAMESPACE_URL, f"{doc_id}#{chunk_idx}"))
+
+
+def store_document(doc_id: str, text: str) -> None:
+    store_documents([doc_id], [text])
+
+
+def store_documents(doc_ids: Sequence[str], texts: Sequence[str]) -> None:
+    """Chunk, embed and upsert documents.
+
+    All chunks are encoded in one batched call, and the resulting numpy
+    matrix goes to Qdrant as is, in batches of 256 points. Nothing is
+    deleted until the new points are written, so a failed encode or upload
+    leaves the previous version of every note searchable.
+    """
+    if not doc_ids:
+        return
+    ids: List[str] = []
+    chunks: List[str] = []
+    payload: List[dict] = []
+    counts: List[int] = []
+    for doc_id, text in zip(doc_ids, texts):
+        doc_chunks = chunk_text(text)
+        counts.append(len(doc_chunks))
+        for idx, chunk in enumerate(doc_chunks):
+            ids.append(_point_id(doc_id, idx))
+            chunks.append(chunk)
+            payload.append({"doc_id": doc_id, "chunk_idx": idx, "text": chunk})
 
-def retrieve_documents(query: str, k: int = 5) -> List[dict]:
     ensure_collection()
     client = get_qdrant()
-    embedder = get_embedder()
-    q_vec = embedder.encode(query).tolist()
-    search_result = client.search(
+    if chunks:
+        vectors = get_embedder().encode(
+            chunks, batch_size=32, convert_to_numpy=True, normalize_embeddings=True
+        )
+        # Qdrant IDs must be unsigned integers or UUIDs. We store the original
+        # document identifier in the payload and derive the point ID from it,
+        # so re-ingesting a note overwrites its chunks in place.
+        client.upload_collection(
+            collection_name=settings.qdrant_collection,
+            vectors=vectors,
+            payload=payload,
+            ids=ids,
+            batch_size=256,
+        )
+    # Only chunks past each note's new end are left over from the old
+    # version; a shorter note would otherwise keep its old tail. Points from
+    # before chunking (random IDs, no chunk_idx) are never overwritten, so
+    # they are dropped as well.
+    stale: List[Filter] = []
+    for doc_id, count in zip(doc_ids, counts):
+        same_doc = FieldCondition(key="doc_id", match=MatchValue(value=doc_id))
+        stale.append(Filter(must=[same_doc, FieldCondition(key="chunk_idx", range=Range(gte=count))]))
+        stale.append(Filter(must=[same_doc, IsEmptyCondition(is_empty=PayloadField(key="chunk_idx"))]))
+    client.delete(
         collection_name=settings.qdrant_collection,
-        query_vector=q_vec,
-        limit=k,
-        query_filter=Filter(must=[]),
+        points_selector=FilterSelector(filter=Filter(should=stale)),
     )
-    docs: List[dict] = []
-    for r in search_result:
-        payload = r.payload or {}
-        docs.append({"id": str(r.id), "text": payload.get("text", "")})
-    return docs
-
-
-async def answer_with_context(question: str) -> Tuple[str, List[str]]:
-    """Run a simple RAG pipeline: retrieve docs, call LLM with context."""
-    docs = retrieve_documents(question, k=5)
-    context = "\n\n".join(d["text"] for d in docs)
-    retrieved_ids = [d["id"] for d in docs]
-
-    messages = [
-        {
-            "role": "system",
-            "content": (
-                "You are a concise personal assistant.\n"
-                "Use the provided context only as factual background.\n"
-                "Always answer the user's question directly and do not ask follow-up "
-                "questions about their goals or intentions unless absolutely necessary."
-            ),
-        },
-        {
-            "role": "user",
-            "content": f"Context:\n{context}\n\nQuestion: {question}",
-        },
-    ]
-
-    llm = OllamaProvider()
-    reply = await llm.generate(messages)
-    return reply, retrieved_ids
+    # Running API workers drop the answers they cached from the old notes.
+    bump_index_version()
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 
 class ChatRequest(BaseModel):
@@ -21,13 +21,12 @@ class TodoCreate(BaseModel):
 
 
 class TodoRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     text: str
     due_at: Optional[datetime] = None
     status: str
     created_at: datetime
 
-    class Config:
-        orm_mode = True
-
 
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any, Dict, List
+import os
+import threading
+from typing import Any, Dict, List, Sequence, Tuple
 
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
@@ -9,10 +11,25 @@ from googleapiclient.discovery import build
 from ..config import get_settings
 
 
+_local = threading.local()
+
+
 def _get_service():
+    """Return a Calendar service, rebuilt only when the token file changes.
+
+    The service's httplib2 connection is not thread-safe, so each worker
+    thread keeps its own; ``asyncio.to_thread`` reuses a small pool, so
+    builds stay rare.
+    """
     settings = get_settings()
+    mtime = os.stat(settings.google_token_file).st_mtime
+    cached = getattr(_local, "service", None)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
     creds = Credentials.from_authorized_user_file(settings.google_token_file, scopes=["https://www.googleapis.com/auth/calendar"])
-    service = build("calendar", "v3", credentials=creds)
+    # The discovery document bundled with the client library; no HTTP fetch.
+    service = build("calendar", "v3", credentials=creds, cache_discovery=False, static_discovery=True)
+    _local.service = (mtime, service)
     return service
 
 
@@ -41,22 +58,44 @@ def create_event(
     return event
 
 
-def list_events(time_min: datetime, time_max: datetime, max_results: int = 10) -> List[Dict[str, Any]]:
-    service = _get_service()
+def _list_request(service, time_min: datetime, time_max: datetime, max_results: int):
     settings = get_settings()
-
-    events_result = (
-        service.events()
-        .list(
-            calendarId=settings.google_calendar_id,
-            timeMin=time_min.isoformat() + "Z",
-            timeMax=time_max.isoformat() + "Z",
-            maxResults=max_results,
-            singleEvents=True,
-            orderBy="startTime",
-        )
-        .execute()
+    return service.events().list(
+        calendarId=settings.google_calendar_id,
+        timeMin=time_min.isoformat() + "Z",
+        timeMax=time_max.isoformat() + "Z",
+        maxResults=max_results,
+        singleEvents=True,
+        orderBy="startTime",
     )
+
+
+def list_events(time_min: datetime, time_max: datetime, max_results: int = 10) -> List[Dict[str, Any]]:
+    service = _get_service()
+    events_result = _list_request(service, time_min, time_max, max_results).execute()
     return events_result.get("items", [])
 
 
+def list_events_batched(
+    ranges: Sequence[Tuple[datetime, datetime]],
+    max_results: int = 10,
+) -> List[Dict[str, Any]]:
+    """List events for several time ranges in one HTTP batch request.
+
+    Returns the items of all ranges, in the order of ``ranges``. Google caps
+    a batch at 50 calls; for many ranges or truly concurrent fetching, an
+    async client such as aiogoogle would fit better.
+    """
+    service = _get_service()
+    results: Dict[str, List[Dict[str, Any]]] = {}
+
+    def collect(request_id: str, response: Dict[str, Any], exception: Exception | None) -> None:
+        if exception is not None:
+            raise exception
+        results[request_id] = response.get("items", [])
+
+    batch = service.new_batch_http_request(callback=collect)
+    for idx, (time_min, time_max) in enumerate(ranges):
+        batch.add(_list_request(service, time_min, time_max, max_results), request_id=str(idx))
+    batch.execute()
+    return [item for idx in range(len(ranges)) for item in results[str(idx)]]
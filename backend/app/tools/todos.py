@@ -1,23 +1,50 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Sequence
 
+from pydantic import TypeAdapter
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session
 
 from .. import models
+from ..schemas import TodoCreate, TodoRead
 
 
 def create_todo(db: Session, text: str, due_at: Optional[datetime]) -> models.Todo:
-    todo = models.Todo(text=text, due_at=due_at, status="open")
-    db.add(todo)
+    """Insert one todo through ``create_todos``.
+
+    The returned object is not attached to the session: it carries the
+    inserted values and id without a refresh round-trip.
+    """
+    [todo_id] = create_todos(db, [TodoCreate(text=text, due_at=due_at)])
+    return models.Todo(id=todo_id, text=text, due_at=due_at, status="open")
+
+
+def create_todos(db: Session, items: Sequence[TodoCreate]) -> List[int]:
+    """Insert todos with one INSERT ... RETURNING and a single commit.
+
+    Returns the new ids in the order of ``items``.
+    """
+    if not items:
+        return []
+    ids = db.scalars(
+        insert(models.Todo).returning(models.Todo.id, sort_by_parameter_order=True),
+        [{**item.model_dump(), "status": "open"} for item in items],
+    ).all()
     db.commit()
-    db.refresh(todo)
-    return todo
+    return list(ids)
 
 
-def list_todos(db: Session, status: Optional[str] = None) -> List[models.Todo]:
-    query = db.query(models.Todo)
-    if status:
-        query = query.filter(models.Todo.status == status)
-    return query.order_by(models.Todo.created_at.desc()).all()
+# Built once: validates a whole result list in a single call.
+_todo_list = TypeAdapter(List[TodoRead])
 
 
+def list_todos(db: Session, status: Optional[str] = None) -> List[TodoRead]:
+    # Plain column rows, not ORM objects: nothing here is modified, so the
+    # identity map and attribute instrumentation would be wasted work.
+    todo = models.Todo
+    query = select(todo.id, todo.text, todo.due_at, todo.status, todo.created_at)
+    if status:
+        query = query.where(todo.status == status)
+    rows = db.execute(query.order_by(todo.created_at.desc())).all()
+    # Rows expose the columns as attributes, which from_attributes reads.
+    return _todo_list.validate_python(rows)